@@ -1,65 +1,101 @@
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS # type: ignore
 from dotenv import load_dotenv # type: ignore
 
+from models.recommendation_model import RecommendationModel
+from models.price_prediction_model import PricePredictionModel
+from models.itinerary_optimizer import ItineraryOptimizer
+from models.weather_forecast_model import WeatherForecastModel
+from models.accommodation_planner import AccommodationPlanner
+from utils.admission import admit
+from utils.caching import conditional, today
+from utils.compression import init_compression
+from utils.deadlines import DeadlineExceeded, bind_deadline
+from utils.serialization import json_response, ndjson_stream, parse_fields, select_fields
+
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
+init_compression(app)
+
+# Load the models once at startup
+recommendation_model = RecommendationModel()
+price_model = PricePredictionModel()
+itinerary_optimizer = ItineraryOptimizer()
+weather_model = WeatherForecastModel()
+accommodation_planner = AccommodationPlanner(itinerary_optimizer, price_model)
+
+
+def _requested_fields(data):
+    """Field selection from the `fields` query parameter or request body."""
+    return parse_fields(request.args.get('fields') or data.get('fields'))
+
+
+def _wants_stream(data):
+    """Whether the client asked for an NDJSON stream instead of a single document."""
+    if str(request.args.get('stream') or data.get('stream') or '').lower() in ('1', 'true', 'ndjson'):
+        return True
+    return 'application/x-ndjson' in request.headers.get('Accept', '')
 
-# We're creating a simplified version without actual ML models
-# but with dummy responses
 
 @app.route('/')
 def home():
     return jsonify({
         'status': 'success',
-        'message': 'Trip Planner ML API is running (Simplified Version)'
+        'message': 'Trip Planner ML API is running'
     })
 
+# Recorded trips change recommendations, so the history log position (the
+# same in every worker once synced) is part of the validator
 @app.route('/api/recommendations', methods=['POST'])
+@conditional(recommendation_model.sync_history)
+@admit('recommendations', limit=16)
 def get_recommendations():
     try:
         data = request.json
         user_preferences = data.get('preferences', {})
         travel_history = data.get('travelHistory', [])
+        diversity = data.get('diversity')
+        fields = _requested_fields(data)
         
-        # Return dummy recommendations
-        dummy_recommendations = [
-            {
-                'id': 1,
-                'name': 'Paris',
-                'country': 'France',
-                'description': 'The City of Light',
-                'similarity_score': 0.92,
-                'cost_index': 8,
-                'image_url': 'https://example.com/paris.jpg'
-            },
-            {
-                'id': 2,
-                'name': 'Bali',
-                'country': 'Indonesia',
-                'description': 'Island of the Gods',
-                'similarity_score': 0.87,
-                'cost_index': 5,
-                'image_url': 'https://example.com/bali.jpg'
-            },
-            {
-                'id': 3,
-                'name': 'Tokyo',
-                'country': 'Japan',
-                'description': 'Where tradition meets future',
-                'similarity_score': 0.81,
-                'cost_index': 8,
-                'image_url': 'https://example.com/tokyo.jpg'
-            }
-        ]
+        recommendations = recommendation_model.predict(user_preferences, travel_history, diversity)
         
-        return jsonify({
+        return json_response({
             'status': 'success',
-            'data': dummy_recommendations
+            'data': [select_fields(item, fields) for item in recommendations]
+        })
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/travel-history', methods=['POST'])
+@admit('travel_history', limit=16)
+def record_travel_history():
+    try:
+        data = request.json
+        user_id = data.get('userId')
+        destinations = data.get('destinations', [])
+        
+        if not user_id:
+            return jsonify({
+                'status': 'error',
+                'message': 'userId is required'
+            }), 400
+        
+        recommendation_model.record_trips(user_id, destinations)
+        
+        return jsonify({
+            'status': 'success'
         })
     except Exception as e:
         return jsonify({
@@ -67,36 +103,35 @@ def get_recommendations():
             'message': str(e)
         }), 500
 
+# Prices depend on how far ahead the stay is, so validators change daily
 @app.route('/api/price-prediction', methods=['POST'])
+@conditional(today)
+@admit('price', limit=16)
 def predict_prices():
     try:
         data = request.json
         destination = data.get('destination')
         dates = data.get('dates', {})
         accommodation_type = data.get('accommodationType', 'hotel')
+        layout = request.args.get('layout') or data.get('layout', 'rows')
+        fields = _requested_fields(data)
         
-        # Return dummy price prediction
-        dummy_price_prediction = {
-            "destination": destination or "Paris",
-            "accommodation_type": accommodation_type,
-            "check_in": dates.get("check_in", "2023-06-01"),
-            "check_out": dates.get("check_out", "2023-06-05"),
-            "num_nights": 4,
-            "daily_prices": [
-                {"date": "2023-06-01", "price": 185.50},
-                {"date": "2023-06-02", "price": 185.50},
-                {"date": "2023-06-03", "price": 225.75},
-                {"date": "2023-06-04", "price": 225.75}
-            ],
-            "total_price": 822.50,
-            "average_price": 205.63,
-            "currency": "USD"
-        }
+        prediction = price_model.predict(destination, dates, accommodation_type, layout=layout)
+        if 'error' in prediction:
+            return jsonify({
+                'status': 'error',
+                'message': prediction['error']
+            }), 400
         
-        return jsonify({
+        return json_response({
             'status': 'success',
-            'data': dummy_price_prediction
+            'data': select_fields(prediction, fields)
         })
+    except DeadlineExceeded as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 504
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -104,57 +139,129 @@ def predict_prices():
         }), 500
 
 @app.route('/api/optimize-itinerary', methods=['POST'])
+@conditional()
+@admit('optimize', limit=4)
 def optimize_itinerary():
     try:
         data = request.json
         destinations = data.get('destinations', [])
         preferences = data.get('preferences', {})
         constraints = data.get('constraints', {})
+        fields = _requested_fields(data)
+        
+        if _wants_stream(data):
+            # Validate and order the cities up front, so bad input is a 400
+            # rather than an error line after a 200
+            destinations, route = itinerary_optimizer.prepare_destinations(destinations, constraints)
+            
+            # Stream each day as soon as it is scheduled, summary last
+            events = itinerary_optimizer.iter_optimize(
+                destinations, preferences, constraints, fields=fields, route=route
+            )
+            return Response(
+                stream_with_context(ndjson_stream(bind_deadline(events))),
+                mimetype='application/x-ndjson'
+            )
         
-        # Return dummy itinerary optimization
-        dummy_optimization = {
-            "itinerary": [
-                {
-                    "destination": "Paris",
-                    "daily_itineraries": [
-                        {
-                            "date": "2023-06-01",
-                            "day_of_week": "Thursday",
-                            "activities": [
-                                {
-                                    "id": "p1",
-                                    "name": "Eiffel Tower",
-                                    "description": "Iconic iron lattice tower",
-                                    "category": "sightseeing",
-                                    "start_time": "10:00",
-                                    "end_time": "13:30",
-                                    "cost": 25.0
-                                },
-                                {
-                                    "id": "p2",
-                                    "name": "Louvre Museum",
-                                    "description": "World's largest art museum",
-                                    "category": "cultural",
-                                    "start_time": "14:30",
-                                    "end_time": "18:30",
-                                    "cost": 15.0
-                                }
-                            ]
-                        }
-                    ]
-                }
-            ],
-            "summary": {
-                "total_destinations": 1,
-                "total_days": 1,
-                "estimated_cost": 40.0
-            }
-        }
+        optimization = itinerary_optimizer.optimize(
+            destinations, preferences, constraints, fields=fields
+        )
         
+        return json_response({
+            'status': 'success',
+            'data': optimization
+        })
+    except ValueError as e:
         return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except DeadlineExceeded as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 504
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/reoptimize-itinerary', methods=['POST'])
+@conditional()
+@admit('reoptimize', limit=4)
+def reoptimize_itinerary():
+    try:
+        data = request.json
+        previous = data.get('itinerary', {})
+        edits = data.get('edits', [])
+        preferences = data.get('preferences', {})
+        constraints = data.get('constraints', {})
+        fields = _requested_fields(data)
+        
+        optimization = itinerary_optimizer.reoptimize(
+            previous, edits, preferences, constraints, fields=fields
+        )
+        if 'error' in optimization:
+            return jsonify({
+                'status': 'error',
+                'message': optimization['error']
+            }), 400
+        
+        return json_response({
             'status': 'success',
-            'data': dummy_optimization
+            'data': optimization
         })
+    except DeadlineExceeded as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 504
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+# Base prices come from the price model, so validators change daily
+@app.route('/api/accommodation-bases', methods=['POST'])
+@conditional(today)
+@admit('accommodation', limit=4)
+def select_accommodation_base():
+    try:
+        data = request.json
+        destination = data.get('destination')
+        dates = data.get('dates', {})
+        preferences = data.get('preferences', {})
+        constraints = data.get('constraints', {})
+        bases = data.get('bases')
+        accommodation_types = data.get('accommodationTypes') or (
+            [data['accommodationType']] if data.get('accommodationType') else None
+        )
+        price_weight = float(data.get('priceWeight', 0.5))
+        max_results = int(data.get('maxResults', 20))
+        fields = _requested_fields(data)
+        
+        plan = accommodation_planner.plan(
+            destination, dates, preferences, constraints, bases=bases,
+            price_weight=price_weight, max_results=max_results, fields=fields,
+            accommodation_types=accommodation_types
+        )
+        if 'error' in plan:
+            return jsonify({
+                'status': 'error',
+                'message': plan['error']
+            }), 400
+        
+        return json_response({
+            'status': 'success',
+            'data': plan
+        })
+    except DeadlineExceeded as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 504
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -162,32 +269,23 @@ def optimize_itinerary():
         }), 500
 
 @app.route('/api/weather-forecast', methods=['POST'])
+@conditional()
+@admit('weather', limit=16)
 def get_weather_forecast():
     try:
         data = request.json
         destination = data.get('destination')
         dates = data.get('dates', {})
+        layout = request.args.get('layout') or data.get('layout', 'rows')
         
-        # Return dummy weather forecast
-        forecast = {
-            'destination': destination or "Paris",
-            'forecast': [
-                {
-                    'date': '2023-06-01',
-                    'temperature': {'min': 20, 'max': 28},
-                    'precipitation': 10,
-                    'weather_condition': 'sunny'
-                },
-                {
-                    'date': '2023-06-02',
-                    'temperature': {'min': 18, 'max': 25},
-                    'precipitation': 30,
-                    'weather_condition': 'partly_cloudy'
-                }
-            ]
-        }
+        forecast = weather_model.predict(destination, dates, layout=layout)
+        if 'error' in forecast:
+            return jsonify({
+                'status': 'error',
+                'message': forecast['error']
+            }), 400
         
-        return jsonify({
+        return json_response({
             'status': 'success',
             'data': forecast
         })
@@ -199,4 +297,5 @@ def get_weather_forecast():
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    debug = os.environ.get('FLASK_DEBUG', 'true').lower() == 'true'
+    app.run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,24 @@
+import os
+import multiprocessing
+
+# Gunicorn settings for the ML service.
+# Every value can be overridden from the environment so that deployment
+# settings can be chosen from load-test results (see load_test.py).
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+
+# Worker model: "sync", "gthread" (threaded) or "gevent" (async, needs gevent)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 2))
+
+# Load the app once in the master so workers share the model data
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
@@ -0,0 +1,376 @@
+"""
+Streaming bulk ingestion of POI and destination catalogs.
+
+Reads a JSONL or CSV catalog (optionally gzipped) in fixed-size chunks,
+validates and normalizes each record, drops duplicate ids and writes the
+columnar arrays that the models load at startup (see utils/catalog_store.py).
+Memory use is bounded by the chunk size, not the catalog size.
+
+Examples:
+    python ingest_catalog.py activities pois.jsonl.gz
+    python ingest_catalog.py destinations destinations.csv --output data/destinations
+    python ingest_catalog.py prices prices.jsonl --chunk-size 10000
+    python ingest_catalog.py histories trips.jsonl --top-n 50
+"""
+import os
+import sys
+import csv
+import gzip
+import json
+import time
+import hashlib
+import argparse
+
+import numpy as np
+
+from utils.catalog_store import CatalogWriter
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SERVICE_DIR, "data")
+
+TIMES_OF_DAY = ("morning", "afternoon", "evening")
+CROWD_LEVELS = ("low", "medium", "high")
+SEASONS = ("spring", "summer", "fall", "winter")
+DESTINATION_FEATURES = (
+    "adventure", "beach", "cultural", "eco_friendly",
+    "family", "luxury", "budget",
+    "spring", "summer", "fall", "winter"
+)
+ACCOMMODATION_TYPES = ("hotel", "hostel", "apartment")
+
+_MISSING = object()
+
+
+# ---------------------------------------------------------------------------
+# Field helpers (records may be nested JSON or flat CSV rows)
+# ---------------------------------------------------------------------------
+
+def _get(record, path, default=_MISSING):
+    """
+    Look up "a.b" as record["a"]["b"], falling back to the flat CSV-style
+    keys "a_b" and then "b".
+    """
+    value = record
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            value = record.get(path.replace(".", "_"), _MISSING)
+            if value is _MISSING:
+                value = record.get(path.rsplit(".", 1)[-1], _MISSING)
+            break
+    if value is _MISSING or value == "" or value is None:
+        if default is _MISSING:
+            raise ValueError(f"missing '{path}'")
+        return default
+    return value
+
+
+def _str(record, path, default=_MISSING):
+    return str(_get(record, path, default)).strip()
+
+
+def _float(record, path, low=None, high=None, default=_MISSING):
+    try:
+        value = float(_get(record, path, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"'{path}' is not a number")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ValueError(f"'{path}' out of range")
+    return value
+
+
+def _minutes(record, path, default=_MISSING):
+    """Normalize "HH:MM" (or an int number of minutes) to minutes after midnight."""
+    value = _get(record, path, default)
+    if isinstance(value, str) and ":" in value:
+        hours, _, minutes = value.partition(":")
+        try:
+            value = int(hours) * 60 + int(minutes)
+        except ValueError:
+            raise ValueError(f"'{path}' is not a HH:MM time")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{path}' is not a time")
+    if not 0 <= value < 24 * 60:
+        raise ValueError(f"'{path}' out of range")
+    return value
+
+
+def _choice(record, path, choices, default=_MISSING):
+    value = _str(record, path, default).lower()
+    if value not in choices:
+        raise ValueError(f"'{path}' must be one of {', '.join(choices)}")
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Per-catalog schemas and normalizers
+# ---------------------------------------------------------------------------
+
+def normalize_activity(record):
+    return {
+        "id": _str(record, "id"),
+        "destination": _str(record, "destination"),
+        "name": _str(record, "name"),
+        "description": _str(record, "description", ""),
+        "category": _str(record, "category").lower(),
+        "popularity": _float(record, "popularity", 0, 10),
+        "duration": int(_float(record, "duration", 1, 24 * 60)),
+        "cost": _float(record, "cost", 0, default=0.0),
+        "lat": _float(record, "coordinates.lat", -90, 90),
+        "lng": _float(record, "coordinates.lng", -180, 180),
+        "open_time": _minutes(record, "open_time", "00:00"),
+        "close_time": _minutes(record, "close_time", "23:59"),
+        "best_time_of_day": _str(record, "best_time_of_day", "morning").lower(),
+        **{
+            f"crowd_{time_of_day}": _choice(record, f"crowd_level.{time_of_day}", CROWD_LEVELS, "medium")
+            for time_of_day in TIMES_OF_DAY
+        }
+    }
+
+
+def normalize_destination(record):
+    normalized = {
+        "id": int(_float(record, "id", 0)),
+        "name": _str(record, "name"),
+        "country": _str(record, "country", ""),
+        "description": _str(record, "description", ""),
+        "image_url": _str(record, "image_url", ""),
+        "cost_index": _float(record, "cost_index", 0, 10)
+    }
+    for feature in DESTINATION_FEATURES:
+        normalized[feature] = _float(record, feature, 0, 1, default=0.0)
+    return normalized
+
+
+def normalize_price(record):
+    normalized = {
+        "name": _str(record, "name"),
+        "weekend_multiplier": _float(record, "weekend_multiplier", 0, default=1.0),
+        "holiday_multiplier": _float(record, "holiday_multiplier", 0, default=1.0)
+    }
+    for accommodation_type in ACCOMMODATION_TYPES:
+        key = f"base_{accommodation_type}_price"
+        normalized[key] = _float(record, key, 0)
+    for season in SEASONS:
+        normalized[f"seasonal_{season}"] = _float(record, f"seasonal_multipliers.{season}", 0, default=1.0)
+    return normalized
+
+
+CATALOGS = {
+    "activities": {
+        "normalize": normalize_activity,
+        "key": "id",
+        "columns": [
+            ("id", "str"), ("destination", "code"), ("name", "str"), ("description", "str"),
+            ("category", "code"), ("popularity", "float32"), ("duration", "int16"),
+            ("cost", "float32"), ("lat", "float32"), ("lng", "float32"),
+            ("open_time", "int16"), ("close_time", "int16"), ("best_time_of_day", "code"),
+            ("crowd_morning", "code"), ("crowd_afternoon", "code"), ("crowd_evening", "code")
+        ]
+    },
+    "destinations": {
+        "normalize": normalize_destination,
+        "key": "id",
+        "columns": [
+            ("id", "int32"), ("name", "str"), ("country", "str"), ("description", "str"),
+            ("image_url", "str"), ("cost_index", "float32")
+        ] + [(feature, "float32") for feature in DESTINATION_FEATURES]
+    },
+    "prices": {
+        "normalize": normalize_price,
+        "key": "name",
+        "columns": [
+            ("name", "str"),
+            ("base_hotel_price", "float32"), ("base_hostel_price", "float32"),
+            ("base_apartment_price", "float32"),
+            ("seasonal_spring", "float32"), ("seasonal_summer", "float32"),
+            ("seasonal_fall", "float32"), ("seasonal_winter", "float32"),
+            ("weekend_multiplier", "float32"), ("holiday_multiplier", "float32")
+        ]
+    }
+}
+
+
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def iter_records(path, fmt=None):
+    """Yield (line_number, record or None) from a JSONL or CSV file, one at a time."""
+    if fmt is None:
+        fmt = "csv" if ".csv" in os.path.basename(path) else "jsonl"
+
+    with _open_text(path) as f:
+        if fmt == "csv":
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                yield line_number, record if isinstance(record, dict) else None
+
+
+def _id_hash(value):
+    """64-bit digest of a record key; keeps the dedup set small for huge catalogs."""
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def ingest(kind, path, output, fmt=None, chunk_size=50000, max_errors=10, progress=True):
+    """Stream a catalog file into columnar arrays. Returns ingestion statistics."""
+    catalog = CATALOGS[kind]
+    normalize = catalog["normalize"]
+    key = catalog["key"]
+
+    writer = CatalogWriter(output, catalog["columns"])
+    seen = set()
+    stats = {"read": 0, "written": 0, "rejected": 0, "duplicates": 0, "errors": []}
+    chunk = []
+    started = time.perf_counter()
+
+    def flush():
+        writer.write_chunk(chunk)
+        stats["written"] += len(chunk)
+        chunk.clear()
+        if progress:
+            elapsed = time.perf_counter() - started
+            print(f"  {stats['read']:,} rows read, {stats['written']:,} written "
+                  f"({stats['read'] / elapsed:,.0f} rows/s)", file=sys.stderr)
+
+    for line_number, record in iter_records(path, fmt):
+        stats["read"] += 1
+        try:
+            if record is None:
+                raise ValueError("not a JSON object")
+            normalized = normalize(record)
+        except ValueError as e:
+            stats["rejected"] += 1
+            if len(stats["errors"]) < max_errors:
+                stats["errors"].append(f"line {line_number}: {e}")
+            continue
+
+        record_key = _id_hash(normalized[key])
+        if record_key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(record_key)
+
+        chunk.append(normalized)
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk or stats["written"] == 0:
+        flush()
+
+    writer.close({"kind": kind, "source": os.path.basename(path)})
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["rows_per_second"] = round(stats["read"] / stats["seconds"]) if stats["seconds"] else 0
+    return stats
+
+
+def ingest_histories(path, output, fmt=None, chunk_size=50000, max_errors=10, progress=True, top_n=20):
+    """
+    Stream travel histories into the item-item similarity table used by
+    RecommendationModel.
+
+    Records are {"userId", "destination"} (one trip per record) or
+    {"userId", "destinations": [...]}. Visits are buffered as compact
+    (user code, item code) arrays per chunk, then the sparse co-visit and
+    top-N similarity tables are computed in one pass. Users are saved under
+    their own ids, the same keys POST /api/travel-history updates.
+    """
+    from models.collaborative_filter import ItemItemCollaborativeFilter
+
+    items = {}
+    user_codes = {}
+    user_chunks, item_chunks = [], []
+    users, visits = [], []
+    stats = {"read": 0, "written": 0, "rejected": 0, "duplicates": 0, "errors": []}
+    started = time.perf_counter()
+
+    def flush():
+        user_chunks.append(np.array(users, dtype=np.int64))
+        item_chunks.append(np.array(visits, dtype=np.int32))
+        stats["written"] += len(visits)
+        users.clear()
+        visits.clear()
+        if progress:
+            elapsed = time.perf_counter() - started
+            print(f"  {stats['read']:,} rows read, {stats['written']:,} visits "
+                  f"({stats['read'] / elapsed:,.0f} rows/s)", file=sys.stderr)
+
+    for line_number, record in iter_records(path, fmt):
+        stats["read"] += 1
+        try:
+            if record is None:
+                raise ValueError("not a JSON object")
+            user_id = record.get("userId") or record.get("user_id")
+            if not user_id:
+                raise ValueError("missing 'userId'")
+            destinations = record.get("destinations") or [_str(record, "destination")]
+        except ValueError as e:
+            stats["rejected"] += 1
+            if len(stats["errors"]) < max_errors:
+                stats["errors"].append(f"line {line_number}: {e}")
+            continue
+
+        user_code = user_codes.setdefault(str(user_id), len(user_codes))
+        for name in destinations:
+            users.append(user_code)
+            visits.append(items.setdefault(str(name).strip(), len(items)))
+        if len(visits) >= chunk_size:
+            flush()
+
+    flush()
+
+    model = ItemItemCollaborativeFilter(sorted(items, key=items.get), top_n=top_n)
+    model.fit_visits(np.concatenate(user_chunks), np.concatenate(item_chunks), user_names=list(user_codes))
+    model.save(output)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["rows_per_second"] = round(stats["read"] / stats["seconds"]) if stats["seconds"] else 0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a catalog into the arrays the ML models load.")
+    parser.add_argument("kind", choices=sorted(CATALOGS) + ["histories"])
+    parser.add_argument("path", help="JSONL or CSV file, optionally .gz")
+    parser.add_argument("--output", help="Output directory (default: data/<kind>)")
+    parser.add_argument("--format", dest="fmt", choices=["jsonl", "csv"], help="Override format detection")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--top-n", type=int, default=20, help="Neighbours kept per destination (histories)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary")
+    args = parser.parse_args(argv)
+
+    if args.kind == "histories":
+        output = args.output or os.path.join(DATA_DIR, "item_similarity.npz")
+        stats = ingest_histories(args.path, output, args.fmt, args.chunk_size,
+                                 progress=not args.quiet, top_n=args.top_n)
+    else:
+        output = args.output or os.path.join(DATA_DIR, args.kind)
+        stats = ingest(args.kind, args.path, output, args.fmt, args.chunk_size, progress=not args.quiet)
+
+    print(f"Ingested {args.kind} into {output}: {stats['written']:,} rows written, "
+          f"{stats['rejected']:,} rejected, {stats['duplicates']:,} duplicates, "
+          f"{stats['rows_per_second']:,} rows/s")
+    for error in stats["errors"]:
+        print(f"  {error}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Local load-test harness for the Trip Planner ML service.
+
+Starts the Flask app (in-process with Werkzeug, or through gunicorn.conf.py),
+replays a weighted mix of recommendation / pricing / itinerary / weather
+requests at a target rate and reports throughput, tail latency and error
+rate per endpoint for each worker model.
+
+Example:
+    python load_test.py --rps 40 --duration 20 \
+        --mix recommendations=4,price=3,itinerary=2,weather=1 \
+        --servers sync,threaded,gunicorn-sync,gunicorn-gthread
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import subprocess
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ENDPOINTS = {
+    "recommendations": "/api/recommendations",
+    "price": "/api/price-prediction",
+    "itinerary": "/api/optimize-itinerary",
+    "weather": "/api/weather-forecast",
+}
+
+DEFAULT_MIX = "recommendations=4,price=3,itinerary=2,weather=1"
+
+# Worker models that can be compared. The in-process servers need nothing
+# beyond Flask; the gunicorn ones are started as subprocesses.
+SERVER_MODES = {
+    "sync": {"kind": "werkzeug", "threaded": False},
+    "threaded": {"kind": "werkzeug", "threaded": True},
+    "gunicorn-sync": {"kind": "gunicorn", "worker_class": "sync"},
+    "gunicorn-gthread": {"kind": "gunicorn", "worker_class": "gthread"},
+    "gunicorn-gevent": {"kind": "gunicorn", "worker_class": "gevent"},
+}
+
+TRAVEL_STYLES = ["adventure", "beach", "cultural", "eco-friendly", "family", "luxury", "budget"]
+SEASONS = ["spring", "summer", "fall", "winter"]
+DESTINATIONS = ["Paris", "Bali", "New York City", "Tokyo", "Santorini"]
+DESTINATION_WEIGHTS = [0.35, 0.25, 0.15, 0.15, 0.10]
+ITINERARY_DESTINATIONS = ["Paris", "Bali"]
+ACTIVITY_CATEGORIES = ["sightseeing", "cultural", "nature", "relaxation"]
+ACCOMMODATION_TYPES = ["hotel", "apartment", "hostel"]
+ACCOMMODATION_WEIGHTS = [0.6, 0.3, 0.1]
+
+
+# ---------------------------------------------------------------------------
+# Payload generators
+# ---------------------------------------------------------------------------
+
+def _random_date_range(rng, max_lead_days=180, mean_nights=4, max_nights=14):
+    """Pick a trip start date ahead of today and a short, skewed stay length."""
+    start = date.today() + timedelta(days=rng.randint(1, max_lead_days))
+    nights = min(max_nights, max(1, int(rng.expovariate(1 / mean_nights)) + 1))
+    return start, start + timedelta(days=nights)
+
+
+def _recommendation_payload(rng):
+    budget_min = rng.choice([0, 0, 2, 4])
+    payload = {
+        "preferences": {
+            "travelStyles": rng.sample(TRAVEL_STYLES, rng.randint(1, 3)),
+            "seasonalPreferences": rng.sample(SEASONS, rng.randint(0, 2)),
+            "budgetRange": {"min": budget_min, "max": rng.randint(max(budget_min, 5), 10)},
+        },
+        "travelHistory": [],
+    }
+    # Roughly a third of users have some travel history
+    if rng.random() < 0.3:
+        payload["travelHistory"] = [
+            {"destination": name} for name in rng.sample(DESTINATIONS, rng.randint(1, 3))
+        ]
+    return payload
+
+
+def _price_payload(rng):
+    check_in, check_out = _random_date_range(rng)
+    return {
+        "destination": rng.choices(DESTINATIONS, DESTINATION_WEIGHTS)[0],
+        "dates": {
+            "check_in": check_in.strftime("%Y-%m-%d"),
+            "check_out": check_out.strftime("%Y-%m-%d"),
+        },
+        "accommodationType": rng.choices(ACCOMMODATION_TYPES, ACCOMMODATION_WEIGHTS)[0],
+    }
+
+
+def _itinerary_payload(rng):
+    start, _ = _random_date_range(rng)
+    destinations = []
+    for name in rng.sample(ITINERARY_DESTINATIONS, rng.randint(1, len(ITINERARY_DESTINATIONS))):
+        end = start + timedelta(days=rng.randint(1, 7))
+        destinations.append({
+            "location": name,
+            "startDate": start.strftime("%Y-%m-%d"),
+            "endDate": end.strftime("%Y-%m-%d"),
+        })
+        start = end
+    return {
+        "destinations": destinations,
+        "preferences": {"categories": rng.sample(ACTIVITY_CATEGORIES, rng.randint(0, 3))},
+        "constraints": {
+            "daily_start_time": rng.choice(["08:00", "09:00", "10:00"]),
+            "daily_end_time": rng.choice(["18:00", "20:00", "22:00"]),
+        },
+    }
+
+
+def _weather_payload(rng):
+    start, end = _random_date_range(rng, mean_nights=5)
+    return {
+        "destination": rng.choices(DESTINATIONS, DESTINATION_WEIGHTS)[0],
+        "dates": {"start": start.strftime("%Y-%m-%d"), "end": end.strftime("%Y-%m-%d")},
+    }
+
+
+PAYLOAD_GENERATORS = {
+    "recommendations": _recommendation_payload,
+    "price": _price_payload,
+    "itinerary": _itinerary_payload,
+    "weather": _weather_payload,
+}
+
+
+def parse_mix(mix):
+    """Parse "name=weight,..." into a {endpoint: weight} dict."""
+    weights = {}
+    for part in mix.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'. Choose from: {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("The request mix must contain at least one endpoint with a positive weight.")
+    return weights
+
+
+# ---------------------------------------------------------------------------
+# Server management
+# ---------------------------------------------------------------------------
+
+class _WerkzeugServer:
+    """Runs app.py in-process on a background thread."""
+
+    def __init__(self, port, threaded):
+        from werkzeug.serving import make_server
+
+        sys.path.insert(0, SERVICE_DIR)
+        from app import app
+
+        # Per-request access logging would dominate the measurement
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self.server = make_server("127.0.0.1", port, app, threaded=threaded)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.thread.join(timeout=5)
+
+
+class _GunicornServer:
+    """Runs app.py under gunicorn using gunicorn.conf.py."""
+
+    def __init__(self, port, worker_class, workers, threads):
+        self.command = [
+            sys.executable, "-m", "gunicorn",
+            "-c", os.path.join(SERVICE_DIR, "gunicorn.conf.py"),
+            "--bind", f"127.0.0.1:{port}",
+            "app:app",
+        ]
+        self.env = {
+            **os.environ,
+            "GUNICORN_WORKER_CLASS": worker_class,
+            "GUNICORN_WORKERS": str(workers),
+            "GUNICORN_THREADS": str(threads),
+        }
+        self.process = None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.command, cwd=SERVICE_DIR, env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def _create_server(mode, port, args):
+    spec = SERVER_MODES[mode]
+    if spec["kind"] == "werkzeug":
+        return _WerkzeugServer(port, spec["threaded"])
+
+    if spec["worker_class"] == "gevent":
+        try:
+            import gevent  # noqa: F401
+        except ImportError:
+            return None
+    return _GunicornServer(port, spec["worker_class"], args.workers, args.threads)
+
+
+def _wait_until_ready(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + "/", timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_load(base_url, weights, rps, duration, concurrency, timeout, seed):
+    """
+    Replay the request mix open-loop at a fixed arrival rate.
+
+    Latency is measured from each request's scheduled send time, so time spent
+    queuing behind a saturated server is included instead of hidden.
+    """
+    rng = random.Random(seed)
+    names = list(weights)
+    name_weights = [weights[name] for name in names]
+    total_requests = int(rps * duration)
+
+    # Pre-build the schedule so payload generation is not on the timed path
+    schedule = []
+    for i in range(total_requests):
+        name = rng.choices(names, name_weights)[0]
+        schedule.append((i / rps, name, json.dumps(PAYLOAD_GENERATORS[name](rng))))
+
+    local = threading.local()
+    results = {name: {"latencies": [], "errors": 0} for name in names}
+    results_lock = threading.Lock()
+
+    def send(scheduled_at, name, body):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        ok = False
+        try:
+            response = session.post(
+                base_url + ENDPOINTS[name], data=body, timeout=timeout,
+                headers={"Content-Type": "application/json"}
+            )
+            ok = response.status_code < 400
+        except requests.RequestException:
+            pass
+        latency = time.monotonic() - scheduled_at
+        with results_lock:
+            results[name]["latencies"].append(latency)
+            if not ok:
+                results[name]["errors"] += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for offset, name, body in schedule:
+            scheduled_at = started + offset
+            delay = scheduled_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, scheduled_at, name, body)
+    elapsed = time.monotonic() - started
+
+    report = {}
+    for name, data in results.items():
+        latencies = sorted(data["latencies"])
+        count = len(latencies)
+        report[name] = {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "error_rate": round(data["errors"] / count, 4) if count else 0.0,
+        }
+    return report
+
+
+def _print_report(mode, report):
+    print(f"\n== {mode} ==")
+    print(f"{'endpoint':<16}{'reqs':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}{'errors':>9}")
+    for name, row in report.items():
+        print(f"{name:<16}{row['requests']:>7}{row['throughput_rps']:>9}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}"
+              f"{row['error_rate'] * 100:>8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Trip Planner ML service.")
+    parser.add_argument("--rps", type=float, default=20, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds of load per server")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted endpoint mix, e.g. price=3,weather=1")
+    parser.add_argument("--servers", default="sync,threaded",
+                        help=f"Comma-separated worker models: {', '.join(SERVER_MODES)}")
+    parser.add_argument("--url", help="Test an already running service instead of starting one")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--concurrency", type=int, default=64, help="Max in-flight client requests")
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request client timeout (s)")
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gthread worker")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    weights = parse_mix(args.mix)
+    all_reports = {}
+
+    if args.url:
+        targets = [("external", None, args.url.rstrip("/"))]
+    else:
+        targets = []
+        for offset, mode in enumerate(m.strip() for m in args.servers.split(",") if m.strip()):
+            if mode not in SERVER_MODES:
+                parser.error(f"Unknown server mode '{mode}'")
+            port = args.port + offset
+            targets.append((mode, port, f"http://127.0.0.1:{port}"))
+
+    for mode, port, base_url in targets:
+        server = None
+        if port is not None:
+            server = _create_server(mode, port, args)
+            if server is None:
+                print(f"\n== {mode} == skipped (worker class not installed)")
+                continue
+            server.start()
+        try:
+            if not _wait_until_ready(base_url):
+                print(f"\n== {mode} == failed to start")
+                continue
+            report = run_load(base_url, weights, args.rps, args.duration,
+                              args.concurrency, args.timeout, args.seed)
+            all_reports[mode] = report
+            _print_report(mode, report)
+        finally:
+            if server is not None:
+                server.stop()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(all_reports, f, indent=2)
+
+    return all_reports
+
+
+if __name__ == "__main__":
+    main()
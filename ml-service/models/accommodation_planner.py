@@ -0,0 +1,223 @@
+import datetime
+
+import numpy as np
+
+ACCOMMODATION_TYPES = ['hotel', 'apartment', 'hostel']
+WALKING_SPEED_KMH = 5  # same speed model as ItineraryOptimizer._estimate_travel_time
+
+# Central locations cost more: up to LOCATION_PREMIUM on top of the model
+# price at the destination's centre, decaying over LOCATION_DECAY_KM
+LOCATION_PREMIUM = 0.6
+LOCATION_DECAY_KM = 2.0
+
+
+def _distances_km(origins, targets):
+    """Great-circle distance in km from every origin to every target ((n, 2) lat/lng arrays)."""
+    origins = np.radians(np.asarray(origins, dtype=np.float64).reshape(-1, 2))
+    targets = np.radians(np.asarray(targets, dtype=np.float64).reshape(-1, 2))
+    lat1, lng1 = origins[:, 0][:, None], origins[:, 1][:, None]
+    lat2, lng2 = targets[:, 0][None, :], targets[:, 1][None, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _walking_minutes(origins, targets):
+    """Walking time in minutes from every origin to every target."""
+    return _distances_km(origins, targets) / WALKING_SPEED_KMH * 60
+
+
+def pareto_front(costs, times):
+    """
+    Indices of the bases not dominated on (nightly cost, commute time).
+
+    Sorting by cost (then time) lets a single running minimum of the commute
+    find the front in O(n log n), returned cheapest first.
+    """
+    order = np.lexsort((times, costs))
+    sorted_times = times[order]
+    best_before = np.minimum.accumulate(np.concatenate(([np.inf], sorted_times[:-1])))
+    return order[sorted_times < best_before]
+
+
+class AccommodationPlanner:
+    def __init__(self, itinerary_optimizer, price_model, grid_size=10):
+        # Combines the two independent models: prices come from the price
+        # model, travel times from the activities the optimizer would plan.
+        # Without explicit candidates, bases are laid out on a grid_size x
+        # grid_size grid over the destination for every accommodation type.
+        self.itinerary_optimizer = itinerary_optimizer
+        self.price_model = price_model
+        self.grid_size = grid_size
+
+    def _candidate_bases(self, destination_name, accommodation_types=None):
+        """Grid of candidate locations covering the destination's activities, per accommodation type."""
+        coordinates = np.array([
+            (a["coordinates"]["lat"], a["coordinates"]["lng"])
+            for a in self.itinerary_optimizer.activities[destination_name]
+        ])
+        low, high = coordinates.min(axis=0), coordinates.max(axis=0)
+        padding = np.maximum((high - low) * 0.1, 0.005)
+        lats = np.linspace(low[0] - padding[0], high[0] + padding[0], self.grid_size)
+        lngs = np.linspace(low[1] - padding[1], high[1] + padding[1], self.grid_size)
+
+        bases = []
+        for accommodation_type in accommodation_types or ACCOMMODATION_TYPES:
+            for lat in lats:
+                for lng in lngs:
+                    bases.append({
+                        "id": f"{accommodation_type}-{len(bases)}",
+                        "lat": round(float(lat), 5),
+                        "lng": round(float(lng), 5),
+                        "accommodation_type": accommodation_type
+                    })
+        return bases
+
+    def _nightly_prices(self, destination_name, dates, bases, base_points):
+        """
+        Nightly price per base.
+
+        A base may carry its own "nightly_price". Otherwise the price model's
+        average for its accommodation type is used (one model call per type),
+        scaled by the base's "price_factor" or, without one, by a location
+        premium that falls off with distance from the destination's centre.
+        """
+        centre = self.itinerary_optimizer.destination_coordinates[destination_name]
+        distance = _distances_km(base_points, [(centre["lat"], centre["lng"])])[:, 0]
+        location_factor = 1 + LOCATION_PREMIUM * np.exp(-distance / LOCATION_DECAY_KM)
+
+        averages = {}
+        prices = np.empty(len(bases))
+        for i, base in enumerate(bases):
+            if base.get("nightly_price") is not None:
+                prices[i] = float(base["nightly_price"])
+                continue
+            accommodation_type = base.get("accommodation_type", "hotel")
+            if accommodation_type not in averages:
+                prediction = self.price_model.predict(destination_name, dates, accommodation_type)
+                if "error" in prediction:
+                    raise ValueError(prediction["error"])
+                averages[accommodation_type] = prediction["average_price"]
+            factor = base.get("price_factor")
+            prices[i] = averages[accommodation_type] * (
+                float(factor) if factor is not None else location_factor[i]
+            )
+        return prices
+
+    def _planned_days(self, destination, preferences, constraints):
+        """Coordinates of the first and last activity of each day of an unanchored plan, plus all stops."""
+        starts, ends, stops = [], [], []
+        for event in self.itinerary_optimizer.iter_optimize([destination], preferences, constraints):
+            if event["type"] != "day" or not event["day"]["activities"]:
+                continue
+            activities = event["day"]["activities"]
+            points = [(a["coordinates"]["lat"], a["coordinates"]["lng"]) for a in activities]
+            starts.append(points[0])
+            ends.append(points[-1])
+            stops.extend(points)
+        return starts, ends, stops
+
+    def plan(self, destination_name, dates, preferences=None, constraints=None, bases=None,
+             price_weight=0.5, max_results=20, fields=None, accommodation_types=None):
+        """
+        Choose where to stay and plan the trip from there.
+
+        The days are planned once without an anchor. Every candidate base is
+        then scored in one pass: its walking time to each day's first and
+        last activity (the commute out and back) comes from a bases x stops
+        time matrix, and its nightly price from the price model (with a
+        location premium). The Pareto front over (price, commute) is returned
+        overall and per accommodation type, and the base with the best
+        `price_weight` trade-off on the overall front (or the one named by
+        constraints["base_id"]) anchors the final itinerary. Generated
+        candidates can be limited to `accommodation_types`.
+        """
+        preferences = preferences or {}
+        constraints = constraints or {}
+        if destination_name not in self.itinerary_optimizer.activities:
+            return {"error": f"Destination '{destination_name}' not found in the database."}
+
+        try:
+            check_in = datetime.datetime.strptime(dates.get("check_in", ""), "%Y-%m-%d")
+            check_out = datetime.datetime.strptime(dates.get("check_out", ""), "%Y-%m-%d")
+        except ValueError:
+            return {"error": "Invalid date format. Please use YYYY-MM-DD."}
+        if check_out <= check_in:
+            return {"error": "Check-out date must be after check-in date."}
+        nights = (check_out - check_in).days
+
+        bases = list(bases) if bases else self._candidate_bases(destination_name, accommodation_types)
+        base_points = np.array([(base["lat"], base["lng"]) for base in bases], dtype=np.float64)
+        destination = {
+            "location": destination_name,
+            "startDate": dates["check_in"],
+            "endDate": dates["check_out"]
+        }
+
+        try:
+            prices = self._nightly_prices(destination_name, dates, bases, base_points)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        # Commute of every base to every planned stop in one matrix operation
+        starts, ends, stops = self._planned_days(destination, preferences, constraints)
+        if stops:
+            commute = (_walking_minutes(base_points, starts).sum(axis=1)
+                       + _walking_minutes(base_points, ends).sum(axis=1))
+            access = _walking_minutes(base_points, stops).mean(axis=1)
+        else:
+            commute = np.zeros(len(bases))
+            access = np.zeros(len(bases))
+
+        front = pareto_front(prices, commute)
+        
+        # The cheapest type tends to dominate the overall front, so each
+        # type's own trade-offs are reported as well
+        types = np.array([base.get("accommodation_type", "hotel") for base in bases])
+        fronts_by_type = {}
+        for accommodation_type in dict.fromkeys(types.tolist()):
+            members = np.flatnonzero(types == accommodation_type)
+            fronts_by_type[accommodation_type] = members[pareto_front(prices[members], commute[members])]
+
+        if constraints.get("base_id") is not None:
+            ids = [base.get("id") for base in bases]
+            if constraints["base_id"] not in ids:
+                return {"error": f"Base '{constraints['base_id']}' is not among the candidates."}
+            chosen = ids.index(constraints["base_id"])
+        else:
+            # Trade price against commute on the front, each scaled to [0, 1]
+            def scaled(values):
+                spread = values.max() - values.min()
+                return (values - values.min()) / spread if spread > 0 else np.zeros(len(values))
+            trade_off = price_weight * scaled(prices[front]) + (1 - price_weight) * scaled(commute[front])
+            chosen = int(front[int(trade_off.argmin())])
+
+        def describe(i):
+            return {
+                **bases[i],
+                "nightly_price": round(float(prices[i]), 2),
+                "total_price": round(float(prices[i]) * nights, 2),
+                "commute_minutes": round(float(commute[i]), 1),
+                "mean_access_minutes": round(float(access[i]), 1)
+            }
+
+        selected = describe(chosen)
+        anchor = {"lat": selected["lat"], "lng": selected["lng"]}
+        itinerary = self.itinerary_optimizer.optimize(
+            [{**destination, "base": anchor}], preferences, constraints, fields=fields
+        )
+
+        return {
+            "destination": destination_name,
+            "check_in": dates["check_in"],
+            "check_out": dates["check_out"],
+            "num_nights": nights,
+            "bases_evaluated": len(bases),
+            "pareto_front": [describe(int(i)) for i in front[:max_results]],
+            "pareto_fronts_by_type": {
+                accommodation_type: [describe(int(i)) for i in members[:max_results]]
+                for accommodation_type, members in fronts_by_type.items()
+            },
+            "selected_base": selected,
+            "itinerary": itinerary
+        }
@@ -0,0 +1,257 @@
+import numpy as np
+
+
+class BudgetedActivitySelector:
+    def __init__(self, cost_buckets=100, time_step=15, max_cells=4_000_000):
+        # Costs in whole cents and times in whole minutes are counted in the
+        # largest unit that divides all of them, so the DP is exact. The
+        # exact DP touches items x cost x time cells; when that grid is too
+        # large, costs are counted in `cost_buckets` steps of the budget
+        # (rounded down, then repaired against the real costs) and times in
+        # `time_step`-minute steps (rounded up). Above `max_cells` even on
+        # that grid, a greedy pass with repair is used instead, so latency
+        # stays bounded for any catalog size.
+        self.cost_buckets = cost_buckets
+        self.time_step = time_step
+        self.max_cells = max_cells
+
+    @staticmethod
+    def _common_unit(amounts, scale):
+        """
+        Largest unit in steps of 1/scale that divides every amount.
+
+        Returns 0.0 when all amounts are zero and None when some amount is
+        not a whole number of steps.
+        """
+        scaled = np.asarray(amounts, dtype=np.float64) * scale
+        steps = np.round(scaled)
+        if not np.allclose(steps, scaled, rtol=0, atol=1e-6):
+            return None
+        if len(steps) == 0:
+            return 0.0
+        return int(np.gcd.reduce(steps.astype(np.int64))) / scale
+
+    @staticmethod
+    def _units(amounts, limit, unit):
+        """Amounts and a limit counted in `unit`s (the unit divides every amount)."""
+        if unit == 0:
+            return np.zeros(len(amounts), dtype=np.int64), 0
+        return np.round(amounts / unit).astype(np.int64), int(np.floor(limit / unit + 1e-6))
+
+    def _time_grid(self, minutes, available_minutes, cost_states):
+        """Time units and capacity: exact when the grid fits in max_cells, else `time_step` rounded up."""
+        time_unit = self._common_unit(minutes, 1)
+        if time_unit is not None:
+            time_units, time_capacity = self._units(minutes, available_minutes, time_unit)
+            if len(minutes) * cost_states * (time_capacity + 1) <= self.max_cells:
+                return time_units, time_capacity, True
+        time_units = np.ceil(minutes / self.time_step - 1e-9).astype(np.int64)
+        return time_units, int(available_minutes // self.time_step), False
+
+    def _discretize(self, costs, minutes, budget, available_minutes):
+        """
+        Integer cost and time units for the DP.
+
+        Returns (cost_units, time_units, capacity, exact). With exact False
+        the costs were rounded down, so a selection may need repair.
+        """
+        cost_unit = self._common_unit(costs, 100)
+        if cost_unit is not None:
+            cost_units, cost_capacity = self._units(costs, budget, cost_unit)
+            time_units, time_capacity, exact = self._time_grid(minutes, available_minutes, cost_capacity + 1)
+            if exact:
+                return cost_units, time_units, (cost_capacity, time_capacity), True
+
+        cost_unit = budget / self.cost_buckets if budget > 0 else 1.0
+        cost_units = np.floor(costs / cost_unit + 1e-9).astype(np.int64)
+        time_units = np.ceil(minutes / self.time_step - 1e-9).astype(np.int64)
+        capacity = (self.cost_buckets if budget > 0 else 0, int(available_minutes // self.time_step))
+        return cost_units, time_units, capacity, False
+
+    def _fill(self, cost_units, time_units, values, capacity):
+        """
+        DP table of the 0/1 knapsack over (cost, time).
+
+        best[c, t] is the highest value within c cost units and t time units.
+        Each item updates the whole table in one vectorized step, and the
+        take flags are kept to walk the choices back.
+        """
+        cost_capacity, time_capacity = capacity
+        best = np.zeros((cost_capacity + 1, time_capacity + 1))
+        take = np.zeros((len(values), cost_capacity + 1, time_capacity + 1), dtype=bool)
+
+        for i, (c, t, value) in enumerate(zip(cost_units, time_units, values)):
+            with_item = best[:cost_capacity + 1 - c, :time_capacity + 1 - t] + value
+            improved = with_item > best[c:, t:]
+            best[c:, t:] = np.where(improved, with_item, best[c:, t:])
+            take[i, c:, t:] = improved
+        return best, take
+
+    def _knapsack(self, cost_units, time_units, values, capacity):
+        """Exact 0/1 knapsack over (cost, time) via dynamic programming."""
+        _, take = self._fill(cost_units, time_units, values, capacity)
+
+        chosen = []
+        c, t = capacity
+        for i in range(len(values) - 1, -1, -1):
+            if take[i, c, t]:
+                chosen.append(i)
+                c -= cost_units[i]
+                t -= time_units[i]
+        return chosen[::-1]
+
+    def _greedy_with_repair(self, cost_units, time_units, values, capacity):
+        """
+        Value density greedy, then repair.
+
+        Items are added by value per share of budget and day. Any capacity
+        left is filled by value alone, and the result is compared with the
+        single most valuable item that fits, which bounds the worst case.
+        """
+        cost_capacity, time_capacity = capacity
+        weight = cost_units / max(cost_capacity, 1) + time_units / max(time_capacity, 1)
+        density = values / np.maximum(weight, 1e-9)
+
+        chosen = np.zeros(len(values), dtype=bool)
+        cost_left, time_left = cost_capacity, time_capacity
+        for order in (np.argsort(-density, kind='stable'), np.argsort(-values, kind='stable')):
+            for i in order:
+                if not chosen[i] and cost_units[i] <= cost_left and time_units[i] <= time_left:
+                    chosen[i] = True
+                    cost_left -= cost_units[i]
+                    time_left -= time_units[i]
+
+        best_single = int(np.argmax(values))
+        if values[best_single] > values[chosen].sum():
+            return [best_single]
+        return np.flatnonzero(chosen).tolist()
+
+    def _repair(self, chosen, costs, minutes, values, budget, available_minutes):
+        """
+        Make a selection made on rounded-down costs fit the real budget.
+
+        The items with the least value per cost are dropped until the real
+        total fits, then anything that still fits is added back by value.
+        """
+        chosen = sorted(chosen, key=lambda i: values[i] / max(costs[i], 1e-9))
+        spent = costs[chosen].sum()
+        while spent > budget + 1e-9:
+            spent -= costs[chosen.pop(0)]
+
+        taken = set(chosen)
+        cost_left = budget - costs[chosen].sum()
+        time_left = available_minutes - minutes[chosen].sum()
+        for i in np.argsort(-values, kind='stable'):
+            if i not in taken and costs[i] <= cost_left + 1e-9 and minutes[i] <= time_left:
+                chosen.append(i)
+                taken.add(i)
+                cost_left -= costs[i]
+                time_left -= minutes[i]
+        return chosen
+
+    def select(self, costs, minutes, values, budget, available_minutes):
+        """
+        Choose the most valuable set of activities within a budget and a day.
+
+        `costs`, `minutes` (time each activity takes, buffers included) and
+        `values` are parallel sequences. Returns (indices in input order,
+        exact) where exact is False when the selection came from the coarse
+        grid or the greedy fallback.
+        """
+        costs = np.asarray(costs, dtype=np.float64)
+        minutes = np.asarray(minutes, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        budget = max(float(budget), 0.0)
+
+        # Only items that are worth something and fit on their own
+        candidates = np.flatnonzero(
+            (values > 0) & (costs <= budget + 1e-9) & (minutes <= available_minutes)
+        )
+        if len(candidates) == 0:
+            return [], True
+        costs, minutes, values = costs[candidates], minutes[candidates], values[candidates]
+
+        cost_units, time_units, capacity, exact = self._discretize(costs, minutes, budget, available_minutes)
+        fits = np.flatnonzero(time_units <= capacity[1])
+        cost_units, time_units = cost_units[fits], time_units[fits]
+
+        cells = len(fits) * (capacity[0] + 1) * (capacity[1] + 1)
+        if cells <= self.max_cells:
+            chosen = fits[self._knapsack(cost_units, time_units, values[fits], capacity)]
+        else:
+            chosen, exact = fits[self._greedy_with_repair(cost_units, time_units, values[fits], capacity)], False
+        if not exact:
+            chosen = self._repair(chosen.tolist(), costs, minutes, values, budget, available_minutes)
+        return sorted(candidates[chosen].tolist()), exact
+
+    def _value_curve(self, costs, minutes, values, cost_unit, cost_capacity, available_minutes):
+        """Best value for every spend of 0..cost_capacity units in one day, or None if the grid is too large."""
+        costs = np.asarray(costs, dtype=np.float64)
+        minutes = np.asarray(minutes, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+
+        candidates = (values > 0) & (minutes <= available_minutes)
+        costs, minutes, values = costs[candidates], minutes[candidates], values[candidates]
+        # Rounded up, so every spend on the curve can really be met
+        cost_units = np.ceil(costs / cost_unit - 1e-9).astype(np.int64)
+        time_units, time_capacity, _ = self._time_grid(minutes, available_minutes, cost_capacity + 1)
+
+        fits = (cost_units <= cost_capacity) & (time_units <= time_capacity)
+        if fits.sum() * (cost_capacity + 1) * (time_capacity + 1) > self.max_cells:
+            return None
+        best, _ = self._fill(cost_units[fits], time_units[fits], values[fits], (cost_capacity, time_capacity))
+        return best[:, time_capacity]
+
+    def split_budget(self, groups, budget, daily_budget, available_minutes):
+        """
+        Share a trip budget out over its days for the highest total value.
+
+        `groups` holds (costs, minutes, values, num_days) for runs of days
+        that choose from the same activities. Each group gets one value
+        curve (its best value for every spend, up to `daily_budget`), and the
+        budget is split over all days with a max-plus DP. Returns the amount
+        for each day in order, or None when the grids would be too large.
+        """
+        budget = max(float(budget), 0.0)
+        num_days = sum(group[3] for group in groups)
+        affordable = np.concatenate([np.asarray(group[0], dtype=np.float64) for group in groups] + [np.zeros(0)])
+        affordable = affordable[affordable <= budget + 1e-9]
+        if num_days == 0 or not affordable.any():
+            return [budget / max(num_days, 1)] * num_days
+
+        cost_unit = self._common_unit(affordable, 100)
+        if cost_unit is None or num_days * (budget / cost_unit + 1) ** 2 > self.max_cells:
+            cost_unit = budget / self.cost_buckets
+        capacity = int(np.floor(budget / cost_unit + 1e-6))
+        day_capacity = capacity
+        if daily_budget is not None:
+            day_capacity = min(capacity, int(np.floor(max(float(daily_budget), 0.0) / cost_unit + 1e-6)))
+
+        curves = []
+        for costs, minutes, values, days in groups:
+            curve = self._value_curve(costs, minutes, values, cost_unit, day_capacity, available_minutes)
+            if curve is None:
+                return None
+            curves.extend([np.pad(curve, (0, capacity - day_capacity), mode='edge')] * days)
+
+        # total[b] is the best value of the days so far within b units; the
+        # spend chosen for each day at each b is kept to walk the split back
+        total = np.zeros(capacity + 1)
+        spends = []
+        for curve in curves:
+            combined = np.full(capacity + 1, -np.inf)
+            spend = np.zeros(capacity + 1, dtype=np.int64)
+            for c in range(capacity + 1):
+                with_spend = curve[c] + total[:capacity + 1 - c]
+                improved = with_spend > combined[c:]
+                combined[c:] = np.where(improved, with_spend, combined[c:])
+                spend[c:][improved] = c
+            total = combined
+            spends.append(spend)
+
+        shares = []
+        b = capacity
+        for spend in reversed(spends):
+            shares.append(int(spend[b]) * cost_unit)
+            b -= spend[b]
+        return shares[::-1]
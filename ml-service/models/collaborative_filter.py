@@ -0,0 +1,247 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class ItemItemCollaborativeFilter:
+    def __init__(self, item_names, top_n=20, shrinkage=5.0):
+        # Items are destinations; users are travellers. We keep the item x item
+        # co-visit counts (C = X^T X for the binary user x item matrix X) and a
+        # truncated top-N cosine similarity table derived from it.
+        self.item_names = list(item_names)
+        self.item_index = {name: i for i, name in enumerate(self.item_names)}
+        self.top_n = top_n
+        self.shrinkage = shrinkage
+
+        n_items = len(self.item_names)
+        self.co_counts = sp.csr_matrix((n_items, n_items), dtype=np.float64)
+        self.similarity = sp.csr_matrix((n_items, n_items), dtype=np.float32)
+        self.user_items = {}
+
+        self._neighbors = [(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))] * n_items
+        self._lock = threading.Lock()
+
+    def _visit_matrix(self, users, items):
+        """Binary user x item matrix from parallel (user row, item column) arrays."""
+        n_users = int(users.max()) + 1 if len(users) else 0
+        visits = sp.csr_matrix(
+            (np.ones(len(users), dtype=np.float64), (users, items)),
+            shape=(n_users, len(self.item_names))
+        )
+        visits.data[:] = 1.0  # repeat visits count once
+        return visits
+
+    def _row_neighbors(self, row):
+        """Top-N shrunk cosine neighbours of one item from its co-visit row."""
+        start, end = self.co_counts.indptr[row], self.co_counts.indptr[row + 1]
+        columns = self.co_counts.indices[start:end]
+        counts = self.co_counts.data[start:end]
+        keep = columns != row
+        columns, counts = columns[keep], counts[keep]
+        if len(columns) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        diagonal = self._diagonal
+        scores = counts / np.sqrt(diagonal[row] * diagonal[columns])
+        # Shrink similarities supported by few co-visits towards zero
+        scores *= counts / (counts + self.shrinkage)
+
+        if len(scores) > self.top_n:
+            top = np.argpartition(-scores, self.top_n - 1)[:self.top_n]
+            columns, scores = columns[top], scores[top]
+        return columns.astype(np.int32), scores.astype(np.float32)
+
+    def _rebuild(self, rows):
+        """Recompute the neighbour lists of `rows` and reassemble the similarity table."""
+        self._diagonal = np.maximum(self.co_counts.diagonal(), 1.0)
+        neighbors = list(self._neighbors)
+        for row in rows:
+            neighbors[row] = self._row_neighbors(row)
+
+        lengths = np.array([len(columns) for columns, _ in neighbors], dtype=np.int64)
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        indices = np.concatenate([columns for columns, _ in neighbors]) if indptr[-1] else np.empty(0, np.int32)
+        data = np.concatenate([scores for _, scores in neighbors]) if indptr[-1] else np.empty(0, np.float32)
+
+        n_items = len(self.item_names)
+        self._neighbors = neighbors
+        self.similarity = sp.csr_matrix((data, indices, indptr), shape=(n_items, n_items))
+
+    def fit_visits(self, users, items, user_names=None):
+        """
+        Build the model from parallel arrays of (user id, item index) visits.
+
+        With `user_names`, `users` holds row numbers into it instead of ids.
+        This is the offline path: everything is computed with sparse matrix
+        products, and the per-user visit sets are kept for later updates
+        (keyed by str(user id), as partial_fit expects).
+        """
+        items = np.asarray(items, dtype=np.int64)
+        if user_names is None:
+            user_ids, user_rows = np.unique(np.asarray(users), return_inverse=True)
+        else:
+            user_ids, user_rows = np.asarray(user_names, dtype=object), np.asarray(users, dtype=np.int64)
+        visits = self._visit_matrix(user_rows, items)
+
+        with self._lock:
+            self.co_counts = (visits.T @ visits).tocsr()
+            self.user_items = {
+                str(user_id): set(visits.indices[visits.indptr[i]:visits.indptr[i + 1]].tolist())
+                for i, user_id in enumerate(user_ids.tolist())
+            }
+            self._rebuild(range(len(self.item_names)))
+        return self
+
+    def fit(self, histories):
+        """Build the model from {user id: [destination names]}."""
+        users, items = [], []
+        for user_id, destinations in histories.items():
+            for name in destinations:
+                if name in self.item_index:
+                    users.append(user_id)
+                    items.append(self.item_index[name])
+        return self.fit_visits(np.array(users, dtype=object), np.array(items, dtype=np.int64))
+
+    def partial_fit(self, user_id, destinations):
+        """
+        Add newly completed trips for one user.
+
+        Only the co-visit counts between the new items and the user's items
+        change. Only the rows whose similarities depend on them are recomputed,
+        i.e. the new items and the items co-visited with them.
+        """
+        user_id = str(user_id)
+        new_items = {self.item_index[name] for name in destinations if name in self.item_index}
+
+        with self._lock:
+            previous = self.user_items.get(user_id, set())
+            new_items -= previous
+            if not new_items:
+                return self
+
+            everything = previous | new_items
+            rows, columns = [], []
+            for item in new_items:
+                for other in everything:
+                    rows.append(item)
+                    columns.append(other)
+                    # Pairs among the new items are covered from both sides already
+                    if other in previous:
+                        rows.append(other)
+                        columns.append(item)
+
+            n_items = len(self.item_names)
+            delta = sp.csr_matrix(
+                (np.ones(len(rows)), (rows, columns)), shape=(n_items, n_items)
+            )
+            self.co_counts = (self.co_counts + delta).tocsr()
+            self.user_items[user_id] = everything
+
+            # Diagonals of the new items changed, so every row that co-occurs
+            # with them needs its cosine scores refreshed
+            affected = set(self.co_counts[list(new_items)].indices.tolist()) | new_items
+            self._rebuild(sorted(affected))
+        return self
+
+    def score(self, destinations):
+        """
+        Collaborative scores for every item given a traveller's history.
+
+        One sparse row lookup per visited item plus a dense sum, so the cost
+        depends on the history length and N, not on the number of users.
+        Scores are scaled to [0, 1].
+        """
+        items = [self.item_index[name] for name in destinations if name in self.item_index]
+        if not items:
+            return np.zeros(len(self.item_names))
+
+        scores = np.asarray(self.similarity[items].sum(axis=0)).ravel()
+        peak = scores.max()
+        return scores / peak if peak > 0 else scores
+
+    def save(self, path, **extra):
+        """
+        Save the co-visit counts and per-user visit sets to a .npz file.
+
+        The file is written next to `path` and renamed into place, so readers
+        never see a partial file. `extra` scalars are stored alongside.
+        """
+        with self._lock:
+            user_ids = list(self.user_items)
+            user_sets = [sorted(self.user_items[user_id]) for user_id in user_ids]
+            co_counts = self.co_counts.copy()
+
+        lengths = np.array([len(items) for items in user_sets], dtype=np.int64)
+        # A unique temp file per writer: workers reach the snapshot
+        # threshold together and must not write into each other's file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                np.savez_compressed(
+                    tmp_file,
+                    item_names=np.array(self.item_names),
+                    top_n=self.top_n,
+                    shrinkage=self.shrinkage,
+                    co_data=co_counts.data,
+                    co_indices=co_counts.indices,
+                    co_indptr=co_counts.indptr,
+                    user_ids=np.array(user_ids, dtype=str),
+                    user_indptr=np.concatenate(([0], np.cumsum(lengths))),
+                    user_indices=np.array([i for items in user_sets for i in items], dtype=np.int64),
+                    **extra
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, item_names=None):
+        """
+        Load tables saved with save(). When `item_names` is given, the model
+        is re-indexed to that item order (unknown items are dropped).
+
+        Returns (model, extra) where extra holds the scalars passed to save().
+        """
+        with np.load(path) as data:
+            saved_names = [str(name) for name in data["item_names"]]
+            n_saved = len(saved_names)
+            co_counts = sp.csr_matrix(
+                (data["co_data"], data["co_indices"], data["co_indptr"]), shape=(n_saved, n_saved)
+            )
+            model = cls(item_names or saved_names, int(data["top_n"]), float(data["shrinkage"]))
+
+            user_items = {}
+            if "user_ids" in data:
+                indptr, indices = data["user_indptr"], data["user_indices"]
+                for i, user_id in enumerate(data["user_ids"].tolist()):
+                    user_items[user_id] = indices[indptr[i]:indptr[i + 1]]
+
+            known = {"item_names", "top_n", "shrinkage", "co_data", "co_indices", "co_indptr",
+                     "user_ids", "user_indptr", "user_indices"}
+            extra = {key: data[key].item() for key in data.files if key not in known}
+
+        # Map saved item positions onto the model's order (unknown items -> -1)
+        mapping = np.array([model.item_index.get(name, -1) for name in saved_names], dtype=np.int64)
+        if item_names is not None:
+            coo = co_counts.tocoo()
+            keep = (mapping[coo.row] >= 0) & (mapping[coo.col] >= 0)
+            n_items = len(model.item_names)
+            co_counts = sp.csr_matrix(
+                (coo.data[keep], (mapping[coo.row[keep]], mapping[coo.col[keep]])),
+                shape=(n_items, n_items)
+            )
+
+        model.co_counts = co_counts
+        model.user_items = {
+            user_id: {int(i) for i in mapping[items] if i >= 0}
+            for user_id, items in user_items.items()
+        }
+        model._rebuild(range(len(model.item_names)))
+        return model, extra
@@ -1,16 +1,184 @@
+import os
 import numpy as np
 import datetime
 import random
 import math
+import heapq
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from utils.catalog_store import catalog_exists, load_catalog, read_codes, read_strings
+from utils.deadlines import check_deadline
+from .budget_selector import BudgetedActivitySelector
+from .route_planner import DestinationRoutePlanner
+
+# Written by `python ingest_catalog.py activities ...`
+DEFAULT_ACTIVITY_CATALOG_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'activities'
+)
+
+class _ActivityCatalog(Mapping):
+    """
+    Read-only {destination: [activity dicts]} view over the optimizer.
+
+    Activity dicts are built on first access to a destination (and kept in
+    a bounded LRU), so a large catalog stays columnar until it is used.
+    """
+    
+    def __init__(self, optimizer):
+        self._optimizer = optimizer
+    
+    def __getitem__(self, destination):
+        return self._optimizer._destination(destination)["activities"]
+    
+    def __contains__(self, destination):
+        return destination in self._optimizer.destination_names
+    
+    def __iter__(self):
+        return iter(self._optimizer.destination_names)
+    
+    def __len__(self):
+        return len(self._optimizer.destination_names)
+
 
 class ItineraryOptimizer:
-    def __init__(self):
+    def __init__(self, cache_size=None):
         # In a real implementation, we would load:
         # - POI (Points of Interest) data for different destinations
         # - Travel time/distance matrices between POIs
         # - User preference models
-        self.activities = self._load_sample_activities()
+        self._load_activities()
+        self.activities = _ActivityCatalog(self)
         
+        # Per-destination activity dicts, id lookups and category indexes,
+        # built lazily and reused across requests
+        self._cache = OrderedDict()
+        self._cache_size = cache_size or int(os.environ.get('ACTIVITY_CACHE_SIZE', 256))
+        self._cache_lock = threading.Lock()
+        
+        self.route_planner = DestinationRoutePlanner()
+        self.budget_selector = BudgetedActivitySelector()
+        
+    def _load_activities(self):
+        """
+        Open the ingested activity catalog if there is one, else the sample data.
+        
+        Only per-destination row indexes and city centroids are computed
+        here; the catalog itself stays memory-mapped.
+        """
+        directory = os.environ.get('ACTIVITY_CATALOG_DIR', DEFAULT_ACTIVITY_CATALOG_DIR)
+        if not catalog_exists(directory):
+            self._catalog = None
+            self._sample_activities = self._load_sample_activities()
+            self.destination_names = set(self._sample_activities)
+            
+            # City locations (centroid of their activities) for ordering trips
+            self.destination_coordinates = {
+                destination: {
+                    "lat": sum(a["coordinates"]["lat"] for a in activities) / len(activities),
+                    "lng": sum(a["coordinates"]["lng"] for a in activities) / len(activities)
+                }
+                for destination, activities in self._sample_activities.items() if activities
+            }
+            return
+        
+        catalog = load_catalog(directory)
+        columns = catalog["columns"]
+        vocabulary = catalog["meta"]["vocabularies"]["destination"]
+        codes = np.asarray(columns["destination"])
+        
+        # Rows of each destination, in catalog order
+        counts = np.bincount(codes, minlength=len(vocabulary))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        row_order = np.argsort(codes, kind="stable")
+        self._catalog = catalog
+        self._destination_rows = {
+            name: row_order[bounds[code]:bounds[code + 1]]
+            for code, name in enumerate(vocabulary) if counts[code]
+        }
+        self.destination_names = set(self._destination_rows)
+        
+        lat_sums = np.bincount(codes, weights=columns["lat"].astype(np.float64).round(5), minlength=len(vocabulary))
+        lng_sums = np.bincount(codes, weights=columns["lng"].astype(np.float64).round(5), minlength=len(vocabulary))
+        self.destination_coordinates = {
+            name: {"lat": float(lat_sums[code] / counts[code]), "lng": float(lng_sums[code] / counts[code])}
+            for code, name in enumerate(vocabulary) if counts[code]
+        }
+    
+    def _decode_activities(self, destination):
+        """Build the activity dicts of one destination from its catalog rows."""
+        if self._catalog is None:
+            return self._sample_activities[destination]
+        
+        catalog = self._catalog
+        columns = catalog["columns"]
+        rows = self._destination_rows[destination]
+        ids = read_strings(catalog, "id", rows)
+        names = read_strings(catalog, "name", rows)
+        descriptions = read_strings(catalog, "description", rows)
+        categories = read_codes(catalog, "category", rows)
+        best_times = read_codes(catalog, "best_time_of_day", rows)
+        crowd_levels = [read_codes(catalog, f"crowd_{t}", rows) for t in ("morning", "afternoon", "evening")]
+        popularity = columns["popularity"][rows].astype(np.float64).round(4).tolist()
+        durations = columns["duration"][rows].tolist()
+        costs = columns["cost"][rows].astype(np.float64).round(2).tolist()
+        lats = columns["lat"][rows].astype(np.float64).round(5).tolist()
+        lngs = columns["lng"][rows].astype(np.float64).round(5).tolist()
+        open_times = columns["open_time"][rows].tolist()
+        close_times = columns["close_time"][rows].tolist()
+        
+        activities = []
+        for i in range(len(rows)):
+            activities.append({
+                "id": ids[i],
+                "name": names[i],
+                "description": descriptions[i],
+                "category": categories[i],
+                "popularity": popularity[i],
+                "duration": durations[i],
+                "cost": costs[i],
+                "coordinates": {"lat": lats[i], "lng": lngs[i]},
+                "open_time": f"{open_times[i] // 60:02d}:{open_times[i] % 60:02d}",
+                "close_time": f"{close_times[i] // 60:02d}:{close_times[i] % 60:02d}",
+                "best_time_of_day": best_times[i],
+                "crowd_level": {
+                    "morning": crowd_levels[0][i],
+                    "afternoon": crowd_levels[1][i],
+                    "evening": crowd_levels[2][i]
+                }
+            })
+        return activities
+    
+    def _destination(self, destination):
+        """
+        Activities of a destination with their lookups, built on first use:
+        {"activities", "by_id", "popularity_order", "category_index"}.
+        """
+        with self._cache_lock:
+            data = self._cache.get(destination)
+            if data is not None:
+                self._cache.move_to_end(destination)
+                return data
+        
+        if destination not in self.destination_names:
+            raise KeyError(destination)
+        activities = self._decode_activities(destination)
+        popularity_order, category_index = self._build_category_index(activities)
+        data = {
+            "activities": activities,
+            "by_id": {activity["id"]: activity for activity in activities},
+            "popularity_order": popularity_order,
+            "category_index": category_index
+        }
+        
+        with self._cache_lock:
+            self._cache[destination] = data
+            self._cache.move_to_end(destination)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return data
+    
     def _load_sample_activities(self):
         """Load sample activity data for demo purposes."""
         sample_data = {
@@ -197,53 +365,122 @@ class ItineraryOptimizer:
         time_hours = distance / speed
         return time_hours * 60  # Convert to minutes
     
-    def _filter_activities_by_preferences(self, activities, preferences):
-        """Filter activities based on user preferences."""
-        filtered_activities = []
+    def _build_category_index(self, activities):
+        """
+        Build a destination's inverted index: category -> activity positions
+        sorted by popularity (descending, catalog order on ties), plus the
+        same ordering over all activities.
+        """
+        order = sorted(range(len(activities)), key=lambda i: (-activities[i]["popularity"], i))
+        by_category = {}
+        for i in order:
+            by_category.setdefault(activities[i]["category"], []).append(i)
+        return order, by_category
+    
+    def _filter_activities_by_preferences(self, destination_name, preferences):
+        """
+        Filter a destination's activities based on user preferences.
+
+        Returns (activities, scores): activities in descending preference
+        order and their preference scores as a parallel list. With preferred
+        categories this is a k-way merge of the pre-sorted category lists.
+        """
+        data = self._destination(destination_name)
+        activities = data["activities"]
         
         # Filter by categories
         preferred_categories = preferences.get('categories', [])
         
-        for activity in activities:
-            # Skip if category doesn't match (if preferences specified)
-            if preferred_categories and activity['category'] not in preferred_categories:
-                continue
-                
-            # Calculate a preference score (higher is better match)
-            score = activity['popularity']
-            
-            # Adjust score based on user preferences
-            if activity['category'] in preferred_categories:
-                score += 2
-                
-            # Add activity with its score
-            filtered_activities.append({
-                **activity,
-                'preference_score': score
-            })
+        if not preferred_categories:
+            order = data["popularity_order"]
+            bonus = 0
+        else:
+            category_index = data["category_index"]
+            lists = [category_index[c] for c in set(preferred_categories) if c in category_index]
+            if len(lists) == 1:
+                order = lists[0]
+            else:
+                order = list(heapq.merge(
+                    *lists, key=lambda i: (-activities[i]["popularity"], i)
+                ))
+            # Matching a preferred category adds to the popularity score
+            bonus = 2
         
-        # Sort by preference score
-        return sorted(filtered_activities, key=lambda x: x['preference_score'], reverse=True)
+        return (
+            [activities[i] for i in order],
+            [activities[i]["popularity"] + bonus for i in order]
+        )
     
-    def _create_daily_itinerary(self, activities, start_time, end_time, current_location=None):
-        """Create a daily itinerary from available activities."""
+    def _create_daily_itinerary(self, activities, scores, start_time, end_time, current_location=None,
+                                pinned=None):
+        """
+        Create a daily itinerary from available activities.
+
+        `scores` holds the preference score of each activity (parallel list).
+        `pinned` is an optional list of (activity, "HH:MM", score) entries that
+        must be scheduled at exactly that time; other activities are fitted
+        around them.
+
+        Returns a list of (activity, travel_time, start_time, end_time, score)
+        slots. The activity dicts are referenced, not copied; use
+        _format_activity to build response records.
+        """
         schedule = []
+        pinned = sorted(
+            (
+                (activity, datetime.datetime.strptime(pin_time, "%H:%M"), score)
+                for activity, pin_time, score in pinned or []
+            ),
+            key=lambda pin: pin[1]
+        )
+        if not activities and not pinned:
+            return schedule
+        
         current_time = datetime.datetime.strptime(start_time, "%H:%M")
         end_datetime = datetime.datetime.strptime(end_time, "%H:%M")
         
         # Start with current location or default
         if current_location is None:
-            current_location = {"lat": activities[0]["coordinates"]["lat"], 
-                                "lng": activities[0]["coordinates"]["lng"]}
+            first_activity = activities[0] if activities else pinned[0][0]
+            current_location = {"lat": first_activity["coordinates"]["lat"], 
+                                "lng": first_activity["coordinates"]["lng"]}
         
-        # Copy the activities list so we can remove items
-        available_activities = activities.copy()
+        # Positions of the activities still available, so we can remove items
+        pinned_ids = {pin[0]["id"] for pin in pinned}
+        available_activities = [i for i, a in enumerate(activities) if a["id"] not in pinned_ids]
         
-        while available_activities and current_time < end_datetime:
+        while pinned or (available_activities and current_time < end_datetime):
+            # Give up between slots once the caller has stopped waiting
+            check_deadline()
+            
+            # Place the next pinned activity once its time has come
+            if pinned and current_time >= pinned[0][1]:
+                activity, pin_time, pin_score = pinned.pop(0)
+                travel_time = self._estimate_travel_time(
+                    current_location["lat"], current_location["lng"],
+                    activity["coordinates"]["lat"], activity["coordinates"]["lng"]
+                )
+                pin_end_time = pin_time + datetime.timedelta(minutes=activity["duration"] + 30)
+                schedule.append((
+                    activity,
+                    travel_time,
+                    pin_time.strftime("%H:%M"),
+                    pin_end_time.strftime("%H:%M"),
+                    pin_score
+                ))
+                current_location = activity["coordinates"]
+                current_time = max(current_time, pin_end_time)
+                continue
+            
+            # Free time runs until the next pinned activity or the end of the day
+            free_until = min(end_datetime, pinned[0][1]) if pinned else end_datetime
+            
             best_activity = None
             best_score = -float('inf')
             
-            for activity in available_activities:
+            for position in available_activities:
+                activity = activities[position]
+                
                 # Skip if activity is closed at current time
                 activity_open = datetime.datetime.strptime(activity["open_time"], "%H:%M")
                 activity_close = datetime.datetime.strptime(activity["close_time"], "%H:%M")
@@ -261,12 +498,12 @@ class ItineraryOptimizer:
                 total_time_needed = travel_time + activity["duration"] + 30  # 30 min buffer
                 activity_end_time = current_time + datetime.timedelta(minutes=total_time_needed)
                 
-                if activity_end_time.time() > end_datetime.time():
+                if activity_end_time.time() > end_datetime.time() or activity_end_time > free_until:
                     continue
                 
                 # Calculate a score based on preference score and travel time
                 time_penalty = travel_time / 30  # Penalty for longer travel
-                score = activity["preference_score"] - time_penalty
+                score = scores[position] - time_penalty
                 
                 # Adjust score based on best time of day
                 time_of_day = "morning"
@@ -287,88 +524,570 @@ class ItineraryOptimizer:
                 
                 if score > best_score:
                     best_score = score
-                    best_activity = {
-                        **activity,
-                        "travel_time": travel_time,
-                        "start_time": current_time.strftime("%H:%M"),
-                        "end_time": activity_end_time.strftime("%H:%M")
-                    }
+                    best_activity = activity
+                    best_position = position
+                    best_travel_time = travel_time
+                    best_end_time = activity_end_time
             
             if best_activity:
-                schedule.append(best_activity)
+                schedule.append((
+                    best_activity,
+                    best_travel_time,
+                    current_time.strftime("%H:%M"),
+                    best_end_time.strftime("%H:%M"),
+                    scores[best_position]
+                ))
                 
                 # Update current location and time
                 current_location = best_activity["coordinates"]
-                current_time = datetime.datetime.strptime(best_activity["end_time"], "%H:%M")
+                current_time = best_end_time.replace(second=0, microsecond=0)
                 
                 # Remove activity from available list
-                available_activities = [a for a in available_activities if a["id"] != best_activity["id"]]
+                available_activities = [i for i in available_activities if i != best_position]
             else:
                 # No suitable activity found, advance time by 30 minutes
                 current_time += datetime.timedelta(minutes=30)
+                if pinned:
+                    current_time = min(current_time, pinned[0][1])
         
         return schedule
     
-    def optimize(self, destinations, preferences, constraints):
-        """Optimize an itinerary based on destinations, preferences, and constraints."""
-        itinerary = []
+    def _select_within_budget(self, activities, scores, budget, start_time, end_time):
+        """
+        Keep the best-value activities whose total cost fits `budget` and
+        whose durations (plus the 30 minute buffer) fit the day.
+
+        Returns (activities, scores, exact), still in preference order.
+        """
+        chosen, exact = self.budget_selector.select(
+            [activity["cost"] for activity in activities],
+            [activity["duration"] + 30 for activity in activities],
+            scores,
+            budget,
+            self._day_minutes(start_time, end_time)
+        )
+        return [activities[i] for i in chosen], [scores[i] for i in chosen], exact
+    
+    def _day_minutes(self, start_time, end_time):
+        day_minutes = (
+            datetime.datetime.strptime(end_time, "%H:%M") - datetime.datetime.strptime(start_time, "%H:%M")
+        ).total_seconds() / 60
+        return max(day_minutes, 0)
+    
+    def _split_trip_budget(self, destinations, preferences, trip_budget, daily_budget, start_time, end_time):
+        """
+        Planned spend for each day of the trip, in trip order.
+
+        Returns (shares, exact). The budget goes where it buys the most
+        value; when the grids would be too large it is split evenly and
+        exact is False.
+        """
+        groups = []
+        for destination in destinations:
+            destination_name = destination.get("location")
+            if destination_name not in self.activities:
+                continue
+            num_days = (datetime.datetime.strptime(destination.get("endDate", ""), "%Y-%m-%d")
+                        - datetime.datetime.strptime(destination.get("startDate", ""), "%Y-%m-%d")).days
+            if num_days <= 0:
+                continue
+            activities, scores = self._filter_activities_by_preferences(destination_name, preferences)
+            groups.append((
+                [activity["cost"] for activity in activities],
+                [activity["duration"] + 30 for activity in activities],
+                scores,
+                num_days
+            ))
+        
+        shares = self.budget_selector.split_budget(
+            groups, trip_budget, daily_budget, self._day_minutes(start_time, end_time)
+        )
+        if shares is not None:
+            return shares, True
+        num_days = sum(group[3] for group in groups)
+        return [max(float(trip_budget), 0.0) / max(num_days, 1)] * num_days, False
+    
+    def _format_activity(self, slot, fields=None):
+        """Build the response record for a scheduled slot, limited to `fields` if given."""
+        activity, travel_time, start_time, end_time, score = slot
+        scheduled = {
+            "travel_time": travel_time,
+            "start_time": start_time,
+            "end_time": end_time
+        }
+        if score is not None:
+            scheduled["preference_score"] = score
+        
+        if fields is None:
+            return {**activity, **scheduled}
+        
+        record = {}
+        for field in fields:
+            if field in scheduled:
+                record[field] = scheduled[field]
+            elif field in activity:
+                record[field] = activity[field]
+        return record
+    
+    def _order_destinations(self, destinations, constraints):
+        """
+        Reorder destinations to minimize inter-city travel and assign dates.
+
+        Each destination needs a stay length: "nights", or startDate/endDate.
+        Stays are laid out back-to-back from constraints["trip_start_date"]
+        (default: the earliest startDate) and must fit before
+        constraints["trip_end_date"] when it is given. An optional
+        constraints["origin"] ({"lat", "lng"}) fixes where the trip starts,
+        and constraints["round_trip"] adds the way back.
+        """
+        stays = []
+        for destination in destinations:
+            nights = destination.get("nights")
+            if nights is None:
+                start_date = datetime.datetime.strptime(destination.get("startDate", ""), "%Y-%m-%d")
+                end_date = datetime.datetime.strptime(destination.get("endDate", ""), "%Y-%m-%d")
+                nights = (end_date - start_date).days
+            stays.append(max(int(nights), 0))
+        
+        trip_start = constraints.get("trip_start_date") or min(
+            (d["startDate"] for d in destinations if d.get("startDate")), default=None
+        )
+        if not trip_start:
+            raise ValueError("A trip_start_date is required to reorder destinations.")
+        trip_start = datetime.datetime.strptime(trip_start, "%Y-%m-%d")
+        
+        if constraints.get("trip_end_date"):
+            trip_end = datetime.datetime.strptime(constraints["trip_end_date"], "%Y-%m-%d")
+            if sum(stays) > (trip_end - trip_start).days:
+                raise ValueError("The stays do not fit in the trip window.")
+        
+        # Cities we can locate are ordered; any others keep their place at the end
+        coordinates = []
+        locatable = []
+        for i, destination in enumerate(destinations):
+            location = destination.get("coordinates") or self.destination_coordinates.get(destination.get("location"))
+            if location:
+                coordinates.append(location)
+                locatable.append(i)
+        
+        order, travel_hours, exact = self.route_planner.plan(
+            coordinates,
+            origin=constraints.get("origin"),
+            round_trip=constraints.get("round_trip", False)
+        )
+        unlocated = [i for i in range(len(destinations)) if i not in set(locatable)]
+        ordered = [locatable[k] for k in order] + unlocated
+        
+        reordered = []
+        current_date = trip_start
+        for i in ordered:
+            end_date = current_date + datetime.timedelta(days=stays[i])
+            reordered.append({
+                **destinations[i],
+                "startDate": current_date.strftime("%Y-%m-%d"),
+                "endDate": end_date.strftime("%Y-%m-%d")
+            })
+            current_date = end_date
+        
+        route = {
+            "order": [destination.get("location") for destination in reordered],
+            "inter_city_travel_hours": round(travel_hours, 2),
+            "exact": exact
+        }
+        return reordered, route
+    
+    def prepare_destinations(self, destinations, constraints):
+        """
+        Check the request and fix the city order before any day is planned.
+
+        Returns (destinations, route): with constraints["flexible_order"] the
+        destinations are reordered and dated and route describes the order,
+        otherwise they are returned as given with route None. Raises
+        ValueError for bad dates or times and for stays that don't fit, so
+        a streaming caller can reject the request before sending a status.
+        """
+        for clock in ("daily_start_time", "daily_end_time"):
+            if constraints.get(clock) is not None:
+                datetime.datetime.strptime(constraints[clock], "%H:%M")
+        
+        route = None
+        if constraints.get("flexible_order"):
+            destinations, route = self._order_destinations(destinations, constraints)
+        
+        for destination in destinations:
+            if destination.get("location") in self.activities:
+                datetime.datetime.strptime(destination.get("startDate", ""), "%Y-%m-%d")
+                datetime.datetime.strptime(destination.get("endDate", ""), "%Y-%m-%d")
+        return destinations, route
+    
+    def iter_optimize(self, destinations, preferences, constraints, fields=None, route=None):
+        """
+        Generate an itinerary incrementally.
+
+        Yields a {"type": "destination"} event when a destination starts, a
+        {"type": "day"} event as soon as each day is scheduled and a final
+        {"type": "summary"} event. Only running totals are kept, so memory
+        does not grow with the length of the trip.
+
+        A trip_budget constraint is split over the days before the first one
+        is planned (see _split_trip_budget); the budget summary's "exact" is
+        False when either that split or a day's selection was approximate.
+        Pass the `route` from prepare_destinations (with the destinations it
+        returned) when the request was already checked.
+        """
+        total_destinations = 0
+        total_days = 0
+        estimated_cost = 0.0
+        
+        # Get start and end times from constraints or use defaults
+        start_time = constraints.get("daily_start_time", "09:00")
+        end_time = constraints.get("daily_end_time", "20:00")
+        
+        # Optionally choose the city order instead of following the request
+        if route is None:
+            destinations, route = self.prepare_destinations(destinations, constraints)
+        
+        # Optional spending caps. The trip budget is shared out over the days
+        # up front, and whatever a day leaves unspent rolls forward
+        daily_budget = constraints.get("daily_budget")
+        trip_budget = constraints.get("trip_budget")
+        budget_left = float(trip_budget) if trip_budget is not None else None
+        budget_exact = True
+        day_shares, reserved = None, 0.0
+        if trip_budget is not None:
+            day_shares, budget_exact = self._split_trip_budget(
+                destinations, preferences, trip_budget, daily_budget, start_time, end_time
+            )
+            reserved = sum(day_shares)
         
         for destination in destinations:
             destination_name = destination.get("location")
             if destination_name not in self.activities:
                 continue
                 
-            # Get activities for this destination
-            destination_activities = self.activities[destination_name]
-            
-            # Filter activities based on preferences
-            filtered_activities = self._filter_activities_by_preferences(
-                destination_activities, 
+            # Get activities for this destination, filtered by preferences
+            filtered_activities, scores = self._filter_activities_by_preferences(
+                destination_name,
                 preferences
             )
             
+            # Days start from the accommodation when one is given
+            base = destination.get("base")
+            
             # Get dates for this destination
             start_date = datetime.datetime.strptime(destination.get("startDate", ""), "%Y-%m-%d")
             end_date = datetime.datetime.strptime(destination.get("endDate", ""), "%Y-%m-%d")
             num_days = (end_date - start_date).days
             
+            total_destinations += 1
+            event = {
+                "type": "destination",
+                "destination": destination_name,
+                "num_days": max(num_days, 0)
+            }
+            if base is not None:
+                # Recorded so later edits re-plan from the same place
+                event["base"] = base
+            yield event
+            
             # Create daily itineraries
-            daily_itineraries = []
             for day in range(num_days):
                 current_date = start_date + datetime.timedelta(days=day)
                 
-                # Get start and end times from constraints or use defaults
-                start_time = constraints.get("daily_start_time", "09:00")
-                end_time = constraints.get("daily_end_time", "20:00")
+                # Pick what the day's budget allows before scheduling
+                day_activities, day_scores = filtered_activities, scores
+                day_budget = float(daily_budget) if daily_budget is not None else None
+                if day_shares is not None:
+                    reserved -= day_shares[total_days]
+                    day_budget = min(
+                        max(budget_left - reserved, 0.0),
+                        day_budget if day_budget is not None else float('inf')
+                    )
+                if day_budget is not None:
+                    day_activities, day_scores, exact = self._select_within_budget(
+                        filtered_activities, scores, day_budget, start_time, end_time
+                    )
+                    budget_exact = budget_exact and exact
                 
                 # Create daily schedule
                 daily_schedule = self._create_daily_itinerary(
-                    filtered_activities,
+                    day_activities,
+                    day_scores,
                     start_time,
-                    end_time
+                    end_time,
+                    current_location=base
                 )
                 
-                daily_itineraries.append({
-                    "date": current_date.strftime("%Y-%m-%d"),
-                    "day_of_week": current_date.strftime("%A"),
-                    "activities": daily_schedule
+                day_cost = sum(slot[0]["cost"] for slot in daily_schedule)
+                total_days += 1
+                estimated_cost += day_cost
+                if budget_left is not None:
+                    budget_left -= day_cost
+                yield {
+                    "type": "day",
+                    "destination": destination_name,
+                    "day": {
+                        "date": current_date.strftime("%Y-%m-%d"),
+                        "day_of_week": current_date.strftime("%A"),
+                        "activities": [self._format_activity(slot, fields) for slot in daily_schedule]
+                    }
+                }
+        
+        summary = {
+            "total_destinations": total_destinations,
+            "total_days": total_days,
+            "estimated_cost": estimated_cost
+        }
+        if route is not None:
+            summary["route"] = route
+        if daily_budget is not None or trip_budget is not None:
+            # Each day is still planned on its own from its share, and the
+            # scheduler may drop a selected activity it can't fit in opening
+            # hours, so "remaining" is what the scheduled days left unspent
+            summary["budget"] = {
+                "daily_budget": daily_budget,
+                "trip_budget": trip_budget,
+                "remaining": round(budget_left, 2) if budget_left is not None else None,
+                "allocation": "per_day_split" if trip_budget is not None else "daily_cap",
+                "exact": budget_exact
+            }
+        
+        yield {
+            "type": "summary",
+            "summary": summary
+        }
+    
+    def optimize(self, destinations, preferences, constraints, fields=None):
+        """
+        Optimize an itinerary based on destinations, preferences, and constraints.
+
+        `fields` optionally restricts each activity record to the named keys.
+        """
+        itinerary = []
+        summary = None
+        
+        for event in self.iter_optimize(destinations, preferences, constraints, fields):
+            if event["type"] == "destination":
+                itinerary.append({
+                    "destination": event["destination"],
+                    "daily_itineraries": []
                 })
+                if "base" in event:
+                    itinerary[-1]["base"] = event["base"]
+            elif event["type"] == "day":
+                itinerary[-1]["daily_itineraries"].append(event["day"])
+            else:
+                summary = event["summary"]
+        
+        return {
+            "itinerary": itinerary,
+            "summary": summary
+        }
+    
+    def _validate_pins(self, catalog, pins, start_time, end_time):
+        """
+        Check that pinned activities can actually happen as pinned.
+
+        Each pin (activity plus the 30 minute buffer) must fall inside the
+        day window and the activity's opening hours, and pins must not
+        overlap each other. Raises ValueError otherwise.
+        """
+        day_start = datetime.datetime.strptime(start_time, "%H:%M")
+        day_end = datetime.datetime.strptime(end_time, "%H:%M")
+        
+        windows = []
+        for activity_id, pin_time in pins.items():
+            activity = catalog[activity_id]
+            pin_start = datetime.datetime.strptime(pin_time, "%H:%M")
+            activity_end = pin_start + datetime.timedelta(minutes=activity["duration"])
+            pin_end = activity_end + datetime.timedelta(minutes=30)
+            opens = datetime.datetime.strptime(activity["open_time"], "%H:%M")
+            closes = datetime.datetime.strptime(activity["close_time"], "%H:%M")
             
-            # Add to overall itinerary
-            itinerary.append({
-                "destination": destination_name,
-                "daily_itineraries": daily_itineraries
-            })
+            if pin_start < day_start or pin_end > day_end:
+                raise ValueError(
+                    f"Pinned activity '{activity_id}' at {pin_time} does not fit between {start_time} and {end_time}."
+                )
+            if pin_start < opens or activity_end > closes:
+                raise ValueError(
+                    f"Pinned activity '{activity_id}' at {pin_time} is outside its opening hours "
+                    f"({activity['open_time']}-{activity['close_time']})."
+                )
+            windows.append((pin_start, pin_end, activity_id))
+        
+        windows.sort()
+        for (_, first_end, first_id), (second_start, _, second_id) in zip(windows, windows[1:]):
+            if second_start < first_end:
+                raise ValueError(f"Pinned activities '{first_id}' and '{second_id}' overlap.")
+    
+    def _replan_day(self, destination_name, day, edits, preferences, start_time, end_time, fields=None,
+                    daily_budget=None, base=None):
+        """
+        Re-plan a single day after applying remove/pin edits to it.
+
+        Pinned activities are always kept; with a `daily_budget` the rest of
+        the day is selected from what their cost leaves over. The day starts
+        from `base` (the destination's accommodation) when there is one.
+        """
+        catalog = self._destination(destination_name)["by_id"]
+        removed = set(day.get("removed", []))
+        pins = {pin["activity_id"]: pin["start_time"] for pin in day.get("pinned", [])}
+        
+        for edit in edits:
+            activity_id = edit.get("activity_id")
+            if activity_id not in catalog:
+                raise ValueError(f"Activity '{activity_id}' not found for {destination_name}.")
+            if edit["type"] == "remove":
+                removed.add(activity_id)
+                pins.pop(activity_id, None)
+            else:
+                try:
+                    datetime.datetime.strptime(edit.get("start_time", ""), "%H:%M")
+                except ValueError:
+                    raise ValueError("Invalid pin start_time. Please use HH:MM.")
+                pins[activity_id] = edit["start_time"]
+                removed.discard(activity_id)
+        
+        self._validate_pins(catalog, pins, start_time, end_time)
+        
+        filtered_activities, scores = self._filter_activities_by_preferences(destination_name, preferences)
+        score_by_id = {activity["id"]: score for activity, score in zip(filtered_activities, scores)}
+        keep = [i for i, activity in enumerate(filtered_activities) if activity["id"] not in removed]
+        pinned = [
+            (catalog[activity_id], pin_time, score_by_id.get(activity_id))
+            for activity_id, pin_time in pins.items()
+        ]
+        
+        day_activities = [filtered_activities[i] for i in keep]
+        day_scores = [scores[i] for i in keep]
+        if daily_budget is not None:
+            unpinned = [i for i, activity in enumerate(day_activities) if activity["id"] not in pins]
+            budget = float(daily_budget) - sum(activity["cost"] for activity, _, _ in pinned)
+            selected, selected_scores, _ = self._select_within_budget(
+                [day_activities[i] for i in unpinned],
+                [day_scores[i] for i in unpinned],
+                max(budget, 0.0),
+                start_time,
+                end_time
+            )
+            day_activities, day_scores = selected, selected_scores
+        
+        daily_schedule = self._create_daily_itinerary(
+            day_activities,
+            day_scores,
+            start_time,
+            end_time,
+            current_location=base,
+            pinned=pinned
+        )
+        
+        replanned = {
+            "date": day["date"],
+            "day_of_week": day.get("day_of_week"),
+            "activities": [self._format_activity(slot, fields) for slot in daily_schedule]
+        }
+        if pins:
+            replanned["pinned"] = [
+                {"activity_id": activity_id, "start_time": pin_time}
+                for activity_id, pin_time in sorted(pins.items(), key=lambda pin: pin[1])
+            ]
+        if removed:
+            replanned["removed"] = sorted(removed)
+        return replanned, sum(slot[0]["cost"] for slot in daily_schedule)
+    
+    def reoptimize(self, previous, edits, preferences, constraints, fields=None):
+        """
+        Apply edits to a previously optimized itinerary, re-planning only the
+        days they touch.
+
+        Each edit names a "destination" and "date" and has a "type":
+        "remove" (with "activity_id"), "pin" (with "activity_id" and
+        "start_time") or "lock_day". Untouched and locked days are returned
+        unchanged. Removals and pins are recorded on the re-planned day so
+        later edits keep honouring them.
+        """
+        start_time = constraints.get("daily_start_time", "09:00")
+        end_time = constraints.get("daily_end_time", "20:00")
+        
+        # Group edits by the day they apply to
+        edits_by_day = {}
+        for edit in edits:
+            if edit.get("type") not in ("remove", "pin", "lock_day"):
+                return {
+                    "error": f"Unknown edit type '{edit.get('type')}'."
+                }
+            key = (edit.get("destination"), edit.get("date"))
+            edits_by_day.setdefault(key, []).append(edit)
+        
+        # Every edit has to name a day of the previous itinerary
+        known_days = {
+            (destination.get("destination"), day.get("date"))
+            for destination in previous.get("itinerary", [])
+            for day in destination.get("daily_itineraries", [])
+        }
+        for destination_name, date in edits_by_day:
+            if (destination_name, date) not in known_days:
+                return {
+                    "error": f"No day {date} for '{destination_name}' in the itinerary."
+                }
+        
+        itinerary = []
+        total_days = 0
+        replanned_days = 0
+        estimated_cost = 0.0
+        
+        try:
+            for destination in previous.get("itinerary", []):
+                destination_name = destination.get("destination")
+                catalog = (
+                    self._destination(destination_name)["by_id"]
+                    if destination_name in self.activities else {}
+                )
+                daily_itineraries = []
+                
+                for day in destination.get("daily_itineraries", []):
+                    day_edits = edits_by_day.get((destination_name, day.get("date")), [])
+                    changes = [edit for edit in day_edits if edit["type"] != "lock_day"]
+                    locked = day.get("locked", False) or len(changes) < len(day_edits)
+                    
+                    if locked or not changes or destination_name not in self.activities:
+                        # Reuse the day as-is
+                        if locked and not day.get("locked"):
+                            day = {**day, "locked": True}
+                        estimated_cost += sum(
+                            catalog[activity["id"]]["cost"] if activity.get("id") in catalog
+                            else activity.get("cost", 0)
+                            for activity in day.get("activities", [])
+                        )
+                    else:
+                        day, day_cost = self._replan_day(
+                            destination_name, day, changes, preferences, start_time, end_time, fields,
+                            daily_budget=constraints.get("daily_budget"),
+                            base=destination.get("base")
+                        )
+                        estimated_cost += day_cost
+                        replanned_days += 1
+                    
+                    daily_itineraries.append(day)
+                    total_days += 1
+                
+                itinerary.append({
+                    "destination": destination_name,
+                    "daily_itineraries": daily_itineraries
+                })
+                if destination.get("base") is not None:
+                    itinerary[-1]["base"] = destination["base"]
+        except ValueError as e:
+            return {
+                "error": str(e)
+            }
         
         return {
             "itinerary": itinerary,
             "summary": {
                 "total_destinations": len(itinerary),
-                "total_days": sum(len(dest["daily_itineraries"]) for dest in itinerary),
-                "estimated_cost": sum(
-                    sum(activity["cost"] for activity in day["activities"])
-                    for dest in itinerary
-                    for day in dest["daily_itineraries"]
-                )
+                "total_days": total_days,
+                "estimated_cost": estimated_cost,
+                "replanned_days": replanned_days
             }
-        } 
\ No newline at end of file
+        }
@@ -2,14 +2,50 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import random
+import os
+
+from utils.catalog_store import catalog_exists, load_catalog, read_strings
+from utils.deadlines import check_deadline
+
+# Written by `python ingest_catalog.py prices ...`
+DEFAULT_PRICE_CATALOG_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'prices'
+)
+
 
 class PricePredictionModel:
     def __init__(self):
         # In a real implementation, we would load:
         # - A pre-trained price prediction model
         # - Historical price data for different destinations
-        self.destinations = self._load_sample_destinations()
+        self.destinations = self._load_destinations()
+        
+    def _load_destinations(self):
+        """Load the ingested price catalog if there is one, else the sample data."""
+        directory = os.environ.get('PRICE_CATALOG_DIR', DEFAULT_PRICE_CATALOG_DIR)
+        if not catalog_exists(directory):
+            return self._load_sample_destinations()
         
+        catalog = load_catalog(directory)
+        columns = {
+            name: np.asarray(catalog["columns"][name], dtype=np.float64).round(4).tolist()
+            for name, kind in catalog["meta"]["columns"] if kind != "str"
+        }
+        destinations = {}
+        for i, name in enumerate(read_strings(catalog, "name")):
+            destinations[name] = {
+                "base_hotel_price": columns["base_hotel_price"][i],
+                "base_hostel_price": columns["base_hostel_price"][i],
+                "base_apartment_price": columns["base_apartment_price"][i],
+                "seasonal_multipliers": {
+                    season: columns[f"seasonal_{season}"][i]
+                    for season in ("spring", "summer", "fall", "winter")
+                },
+                "weekend_multiplier": columns["weekend_multiplier"][i],
+                "holiday_multiplier": columns["holiday_multiplier"][i]
+            }
+        return destinations
+    
     def _load_sample_destinations(self):
         """Load sample destination data with price information for demo purposes."""
         sample_data = {
@@ -109,9 +145,15 @@ class PricePredictionModel:
         ]
         return (date.month, date.day) in holidays
     
-    def _add_noise(self, price, variance_percent=5):
-        """Add some random noise to the price to simulate real-world variability."""
-        noise_factor = 1 + (random.random() * 2 - 1) * (variance_percent / 100)
+    def _add_noise(self, price, variance_percent=5, seed=None):
+        """
+        Add some random noise to the price to simulate real-world variability.
+
+        When a seed is given the noise is reproducible, so the same request
+        always yields the same prices (which keeps ETags meaningful).
+        """
+        rng = random.Random(seed) if seed is not None else random
+        noise_factor = 1 + (rng.random() * 2 - 1) * (variance_percent / 100)
         return price * noise_factor
     
     def _calculate_price_trend(self, base_date, target_date):
@@ -127,8 +169,13 @@ class PricePredictionModel:
         else:
             return 1.0  # Far ahead
     
-    def predict(self, destination, dates, accommodation_type='hotel'):
-        """Predict accommodation prices for a destination on given dates."""
+    def predict(self, destination, dates, accommodation_type='hotel', layout='rows'):
+        """
+        Predict accommodation prices for a destination on given dates.
+
+        With layout='columns', daily prices are returned as parallel
+        {"date": [...], "price": [...]} lists instead of one dict per night.
+        """
         if destination not in self.destinations:
             return {
                 "error": f"Destination '{destination}' not found in the database."
@@ -167,9 +214,11 @@ class PricePredictionModel:
         today = datetime.now().date()
         
         # Calculate prices for each day
-        daily_prices = []
+        price_dates = []
+        prices = []
         current_date = check_in
         while current_date < check_out:
+            check_deadline()
             season = self._get_season(current_date)
             seasonal_multiplier = dest_data["seasonal_multipliers"][season]
             
@@ -186,19 +235,29 @@ class PricePredictionModel:
             daily_price = base_price * seasonal_multiplier * weekend_multiplier * holiday_multiplier * trend_multiplier
             
             # Add some random noise to simulate real-world variability
-            daily_price = self._add_noise(daily_price)
+            date_str = current_date.strftime("%Y-%m-%d")
+            daily_price = self._add_noise(
+                daily_price,
+                seed=f"{destination}|{accommodation_type}|{date_str}"
+            )
             
-            daily_prices.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "price": round(daily_price, 2)
-            })
+            price_dates.append(date_str)
+            prices.append(round(daily_price, 2))
             
             current_date += timedelta(days=1)
         
         # Calculate total and average prices
-        total_price = sum(item["price"] for item in daily_prices)
+        total_price = sum(prices)
         average_price = total_price / num_nights
         
+        if layout == 'columns':
+            daily_prices = {"date": price_dates, "price": prices}
+        else:
+            daily_prices = [
+                {"date": price_date, "price": price}
+                for price_date, price in zip(price_dates, prices)
+            ]
+        
         return {
             "destination": destination,
             "accommodation_type": accommodation_type,
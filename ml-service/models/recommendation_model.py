@@ -3,6 +3,37 @@ import pandas as pd
 from sklearn.metrics.pairwise import cosine_similarity
 import os
 import json
+import threading
+
+from utils.catalog_store import catalog_exists, load_catalog, read_strings
+from .collaborative_filter import ItemItemCollaborativeFilter
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# Written by `python ingest_catalog.py destinations ...`
+DEFAULT_DESTINATION_CATALOG_DIR = os.path.join(DATA_DIR, 'destinations')
+
+# Written by `python ingest_catalog.py histories ...`, and refreshed with
+# recorded trips as they come in
+DEFAULT_SIMILARITY_PATH = os.path.join(DATA_DIR, 'item_similarity.npz')
+
+# Recorded trips are appended here and replayed by every worker process, so
+# all workers (and restarts) converge on the same collaborative model
+DEFAULT_HISTORY_LOG_PATH = os.path.join(DATA_DIR, 'travel_history.jsonl')
+# Save a similarity snapshot (with its log position) after this many updates
+SNAPSHOT_EVERY = int(os.environ.get('HISTORY_SNAPSHOT_EVERY', 1000))
+
+# Number of recommendations returned per request
+TOP_K = 5
+# Above this many distinct cost_index values the ranking table is not built
+MAX_BUDGET_LEVELS = 256
+# Destinations scored per block while building the ranking table
+RANKING_BLOCK_SIZE = 4096
+# Diversity re-ranking defaults: weight of relevance vs. novelty, and how
+# many of the most relevant destinations are considered
+DIVERSITY_WEIGHT = 0.7
+DIVERSITY_CANDIDATES = 200
+
 
 class RecommendationModel:
     def __init__(self):
@@ -10,13 +41,211 @@ class RecommendationModel:
         # - A pre-trained recommendation model
         # - Dataset of destinations with features
         # - User similarity matrix
-        self.destinations = self._load_sample_destinations()
+        self.destinations = self._load_destinations()
         self.feature_columns = [
             'adventure', 'beach', 'cultural', 'eco_friendly', 
             'family', 'luxury', 'budget', 
             'spring', 'summer', 'fall', 'winter'
         ]
         
+        # Item-item collaborative filtering over travel histories, blended
+        # with the content (cosine) score when a history is available
+        self.similarity_path = os.environ.get('SIMILARITY_PATH', DEFAULT_SIMILARITY_PATH)
+        self.history_log_path = os.environ.get('HISTORY_LOG_PATH', DEFAULT_HISTORY_LOG_PATH)
+        self.collaborative_filter, self.log_offset = self._load_collaborative_filter()
+        self.collaborative_weight = float(os.environ.get('COLLABORATIVE_WEIGHT', 0.3))
+        self._history_lock = threading.Lock()
+        self._updates_since_snapshot = 0
+        
+        # The log position identifies the collaborative model's state, so it
+        # is the same in every worker that has caught up with the log
+        self.version = self.log_offset
+        self.sync_history()
+        
+        # Top destinations for every explicit-preference vector, so requests
+        # without a travel history are answered by a table lookup
+        self._build_ranking_table()
+        
+        # Unit-length feature rows and country codes for diversity re-ranking
+        features = self.destinations[self.feature_columns].values.astype(np.float64)
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        self.unit_features = features / np.where(norms > 0, norms, 1.0)
+        self.country_codes = pd.factorize(self.destinations['country'])[0]
+        
+    def _load_collaborative_filter(self):
+        """
+        Load the latest item-item similarity snapshot, or start an empty one.
+        
+        Returns (model, log offset): the position in the history log the
+        snapshot already includes.
+        """
+        names = self.destinations['name'].tolist()
+        if os.path.exists(self.similarity_path):
+            model, extra = ItemItemCollaborativeFilter.load(self.similarity_path, item_names=names)
+            return model, int(extra.get('log_offset', 0))
+        return ItemItemCollaborativeFilter(names), 0
+    
+    def sync_history(self):
+        """
+        Apply trips appended to the history log since we last looked, e.g.
+        by other workers. Cheap when nothing changed (one stat call).
+        Returns the model version.
+        """
+        try:
+            size = os.path.getsize(self.history_log_path)
+        except OSError:
+            return self.version
+        if size <= self.log_offset:
+            return self.version
+        
+        with self._history_lock:
+            with open(self.history_log_path, 'rb') as f:
+                f.seek(self.log_offset)
+                data = f.read(max(size - self.log_offset, 0))
+            
+            # Only whole lines; a trailing partial line is still being written
+            complete = data.rfind(b'\n') + 1
+            for line in data[:complete].splitlines():
+                try:
+                    entry = json.loads(line)
+                    self.collaborative_filter.partial_fit(entry['user_id'], entry['destinations'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                self._updates_since_snapshot += 1
+            
+            self.log_offset += complete
+            self.version = self.log_offset
+        return self.version
+    
+    def record_trips(self, user_id, destinations):
+        """
+        Record a user's new trips in the shared history log and apply them.
+        
+        Every SNAPSHOT_EVERY updates the model is saved with its log position,
+        so restarts only replay the log written since.
+        """
+        line = json.dumps({'user_id': user_id, 'destinations': list(destinations)}) + '\n'
+        os.makedirs(os.path.dirname(self.history_log_path) or '.', exist_ok=True)
+        # One append-mode write per entry, so concurrent workers don't interleave
+        with open(self.history_log_path, 'ab') as f:
+            f.write(line.encode('utf-8'))
+        
+        version = self.sync_history()
+        if self._updates_since_snapshot >= SNAPSHOT_EVERY:
+            self.save_snapshot()
+        return version
+    
+    def save_snapshot(self):
+        """Save the collaborative model together with the log position it includes."""
+        with self._history_lock:
+            self.collaborative_filter.save(self.similarity_path, log_offset=self.log_offset)
+            self._updates_since_snapshot = 0
+    
+    def _build_ranking_table(self):
+        """
+        Precompute rankings for every preference vector without history.
+        
+        Without a travel history the user vector is binary over the 11
+        features, so there are only 2**11 distinct vectors. For each of them,
+        and for each distinct cost_index level, we keep the TOP_K destinations
+        by cosine similarity. A budget range selects a contiguous run of
+        levels, so a request only has to merge a handful of candidates.
+        Must be called again whenever self.destinations changes.
+        """
+        self.ranking_levels = None
+        costs = self.destinations['cost_index'].values.astype(np.float64)
+        levels, level_of = np.unique(costs, return_inverse=True)
+        if len(levels) > MAX_BUDGET_LEVELS or np.isnan(levels).any():
+            return
+        
+        n_features = len(self.feature_columns)
+        vectors = ((np.arange(2 ** n_features)[:, None] >> np.arange(n_features)) & 1).astype(np.float64)
+        features = self.destinations[self.feature_columns].values.astype(np.float64)
+        
+        items = np.full((len(vectors), len(levels), TOP_K), -1, dtype=np.int64)
+        scores = np.full((len(vectors), len(levels), TOP_K), -np.inf)
+        rows = np.arange(len(vectors))[:, None]
+        
+        for level in range(len(levels)):
+            members = np.flatnonzero(level_of == level)
+            for start in range(0, len(members), RANKING_BLOCK_SIZE):
+                block = members[start:start + RANKING_BLOCK_SIZE]
+                candidates = np.concatenate(
+                    [items[:, level], np.broadcast_to(block, (len(vectors), len(block)))], axis=1
+                )
+                candidate_scores = np.concatenate(
+                    [scores[:, level], cosine_similarity(vectors, features[block])], axis=1
+                )
+                # Highest similarity first, ties in catalog order
+                order = np.lexsort((candidates, -candidate_scores))[:, :TOP_K]
+                items[:, level] = candidates[rows, order]
+                scores[:, level] = candidate_scores[rows, order]
+        
+        self.ranking_levels = levels
+        self.ranking_items = items
+        self.ranking_scores = scores
+    
+    def _lookup_ranking(self, user_vector, min_budget, max_budget):
+        """Top destinations (positions, similarities) for a binary user vector from the table."""
+        key = int(user_vector.astype(np.int64) @ (1 << np.arange(len(user_vector))))
+        low = np.searchsorted(self.ranking_levels, min_budget, side='left')
+        high = np.searchsorted(self.ranking_levels, max_budget, side='right')
+        
+        candidates = self.ranking_items[key, low:high].ravel()
+        candidate_scores = self.ranking_scores[key, low:high].ravel()
+        keep = candidates >= 0
+        candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+        
+        order = np.lexsort((candidates, -candidate_scores))[:TOP_K]
+        return candidates[order], candidate_scores[order]
+    
+    def _rerank_diverse(self, positions, relevance, weight, max_per_country=None):
+        """
+        Maximal marginal relevance over candidate destinations.
+        
+        Each pick maximizes weight * relevance - (1 - weight) * (highest
+        similarity to anything already picked). That maximum is updated
+        incrementally with one matrix-vector product per pick, so re-ranking
+        a few hundred candidates costs microseconds. With `max_per_country`,
+        a country is dropped from the candidates once it has that many picks,
+        so fewer than TOP_K may be returned if the candidates run out.
+        Returns indices into `positions` in pick order.
+        """
+        features = self.unit_features[positions]
+        countries = self.country_codes[positions]
+        closest = np.zeros(len(positions))
+        available = np.ones(len(positions), dtype=bool)
+        picked_per_country = {}
+        
+        picks = []
+        while len(picks) < TOP_K and available.any():
+            marginal = np.where(available, weight * relevance - (1 - weight) * closest, -np.inf)
+            pick = int(marginal.argmax())
+            picks.append(pick)
+            available[pick] = False
+            closest = np.maximum(closest, features @ features[pick])
+            
+            country = countries[pick]
+            picked_per_country[country] = picked_per_country.get(country, 0) + 1
+            if max_per_country and picked_per_country[country] >= max_per_country:
+                available &= countries != country
+        return np.array(picks, dtype=np.int64)
+    
+    def _load_destinations(self):
+        """Load the ingested destination catalog if there is one, else the sample data."""
+        directory = os.environ.get('DESTINATION_CATALOG_DIR', DEFAULT_DESTINATION_CATALOG_DIR)
+        if not catalog_exists(directory):
+            return self._load_sample_destinations()
+        
+        catalog = load_catalog(directory)
+        data = {}
+        for name, kind in catalog["meta"]["columns"]:
+            if kind == "str":
+                data[name] = read_strings(catalog, name)
+            else:
+                data[name] = np.asarray(catalog["columns"][name])
+        return pd.DataFrame(data)
+    
     def _load_sample_destinations(self):
         """Load sample destination data for demo purposes."""
         # In a real scenario, this would load from a database or CSV file
@@ -177,11 +406,61 @@ class RecommendationModel:
         
         return user_vector
     
-    def predict(self, user_preferences, travel_history=None):
-        """Predict destination recommendations based on user preferences and history."""
+    def _diversity_options(self, diversity):
+        """
+        Re-ranking options from a request's `diversity`, or None when it is off.
+
+        None and False turn it off; True or an object (missing keys take the
+        defaults) turn it on. Raises ValueError for values of the wrong type.
+        """
+        if diversity is None or diversity is False:
+            return None
+        if diversity is True:
+            diversity = {}
+        if not isinstance(diversity, dict):
+            raise ValueError("diversity must be true, false or an object.")
+        
+        try:
+            weight = float(diversity.get('weight', DIVERSITY_WEIGHT))
+            candidates = int(diversity.get('candidates', DIVERSITY_CANDIDATES))
+            max_per_country = diversity.get('maxPerCountry')
+            if max_per_country is not None:
+                max_per_country = int(max_per_country)
+        except (TypeError, ValueError):
+            raise ValueError("diversity weight must be a number and maxPerCountry and candidates integers.")
+        if not np.isfinite(weight):
+            raise ValueError("diversity weight must be a number between 0 and 1.")
+        if max_per_country is not None and max_per_country < 1:
+            raise ValueError("diversity maxPerCountry must be at least 1.")
+        
+        return {
+            'weight': min(max(weight, 0.0), 1.0),
+            'candidates': max(candidates, TOP_K),
+            'max_per_country': max_per_country
+        }
+    
+    def predict(self, user_preferences, travel_history=None, diversity=None):
+        """
+        Predict destination recommendations based on user preferences and history.
+        
+        `diversity` (True or {"weight", "maxPerCountry", "candidates"})
+        re-ranks the most relevant candidates for variety instead of
+        returning the raw top 5. Raises ValueError for malformed options.
+        """
+        diversity = self._diversity_options(diversity)
+        
         # Create user preference vector
         user_vector = self._create_user_vector(user_preferences)
         
+        # Get budget constraints if provided
+        min_budget = user_preferences.get('budgetRange', {}).get('min', 0) / 10 * 10
+        max_budget = user_preferences.get('budgetRange', {}).get('max', 10) / 10 * 10
+        
+        # Explicit preferences only: the ranking is precomputed
+        if not travel_history and diversity is None and self.ranking_levels is not None:
+            positions, similarities = self._lookup_ranking(user_vector, min_budget, max_budget)
+            return self._format_recommendations(positions, similarities)
+        
         # Incorporate travel history if available
         if travel_history:
             user_vector = self._incorporate_travel_history(user_vector, travel_history)
@@ -193,32 +472,54 @@ class RecommendationModel:
         user_vector = user_vector.reshape(1, -1)
         similarities = cosine_similarity(user_vector, destination_features)[0]
         
-        # Get budget constraints if provided
-        min_budget = user_preferences.get('budgetRange', {}).get('min', 0)
-        max_budget = user_preferences.get('budgetRange', {}).get('max', 10)
+        # Blend in collaborative scores from travellers with similar histories
+        if travel_history:
+            collaborative_scores = self.collaborative_filter.score(
+                [item['destination'] for item in travel_history]
+            )
+            if collaborative_scores.any():
+                weight = self.collaborative_weight
+                similarities = (1 - weight) * similarities + weight * collaborative_scores
         
         # Filter by budget constraints
-        budget_mask = (self.destinations['cost_index'] >= min_budget / 10 * 10) & \
-                      (self.destinations['cost_index'] <= max_budget / 10 * 10)
+        costs = self.destinations['cost_index'].values
+        candidates = np.flatnonzero((costs >= min_budget) & (costs <= max_budget))
         
-        # Get top recommendations
-        self.destinations['similarity'] = similarities
-        filtered_destinations = self.destinations[budget_mask].sort_values('similarity', ascending=False)
+        # Top recommendations; the stable sort keeps ties in catalog order,
+        # matching the precomputed rankings
+        if diversity is None:
+            order = np.argsort(-similarities[candidates], kind='stable')[:TOP_K]
+            positions = candidates[order]
+            return self._format_recommendations(positions, similarities[positions])
         
-        # Return top 5 recommendations
-        top_recommendations = filtered_destinations.head(5)
+        order = np.argsort(-similarities[candidates], kind='stable')[:diversity['candidates']]
+        positions = candidates[order]
+        picks = self._rerank_diverse(
+            positions,
+            similarities[positions],
+            diversity['weight'],
+            diversity['max_per_country']
+        )
+        positions = positions[picks]
+        return self._format_recommendations(positions, similarities[positions])
+    
+    def _format_recommendations(self, positions, similarities):
+        """Response records for destinations at the given row positions."""
+        columns = {
+            name: self.destinations[name].values[positions]
+            for name in ('id', 'name', 'country', 'description', 'cost_index', 'image_url')
+        }
         
-        # Format results
         recommendations = []
-        for _, row in top_recommendations.iterrows():
+        for i, similarity in enumerate(similarities):
             recommendations.append({
-                'id': int(row['id']),
-                'name': row['name'],
-                'country': row['country'],
-                'description': row['description'],
-                'similarity_score': float(row['similarity']),
-                'cost_index': int(row['cost_index']),
-                'image_url': row['image_url']
+                'id': int(columns['id'][i]),
+                'name': columns['name'][i],
+                'country': columns['country'][i],
+                'description': columns['description'][i],
+                'similarity_score': float(similarity),
+                'cost_index': int(columns['cost_index'][i]),
+                'image_url': columns['image_url'][i]
             })
         
-        return recommendations 
\ No newline at end of file
+        return recommendations
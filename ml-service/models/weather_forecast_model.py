@@ -0,0 +1,315 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+DEFAULT_CLIMATOLOGY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'climatology.npz'
+)
+
+CONDITIONS = np.array(['sunny', 'partly_cloudy', 'cloudy', 'light_rain', 'rain', 'snow'])
+
+
+class WeatherForecastModel:
+    def __init__(self, climatology_path=None, cache_size=4096):
+        # Per-destination monthly climatology: row i of every table belongs to
+        # self.destination_names[i], column j to month j (January = 0).
+        path = climatology_path or os.environ.get('CLIMATOLOGY_PATH', DEFAULT_CLIMATOLOGY_PATH)
+        if os.path.exists(path):
+            tables = self._load_climatology(path)
+        else:
+            tables = self._load_sample_climatology()
+
+        self.destination_names = [str(name) for name in tables['destinations']]
+        self.destination_index = {name: i for i, name in enumerate(self.destination_names)}
+        self.temp_min = np.asarray(tables['temp_min'], dtype=np.float32)
+        self.temp_max = np.asarray(tables['temp_max'], dtype=np.float32)
+        self.precip_mm = np.asarray(tables['precip_mm'], dtype=np.float32)
+        self.rain_days = np.asarray(tables['rain_days'], dtype=np.float32)
+
+        # Forecast blocks cached per (destination index, "YYYY-MM")
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
+    def _load_climatology(self, path):
+        """Load climatology tables from a compact .npz array file."""
+        with np.load(path) as data:
+            return {key: data[key] for key in data.files}
+
+    def _load_sample_climatology(self):
+        """Load sample monthly climatology (Jan..Dec) for demo purposes."""
+        sample_data = {
+            "Paris": {
+                "temp_min": [3, 3, 5, 7, 10, 13, 15, 15, 12, 9, 6, 3],
+                "temp_max": [7, 9, 13, 16, 20, 23, 25, 25, 21, 16, 11, 8],
+                "precip_mm": [51, 41, 48, 52, 63, 50, 62, 53, 47, 62, 51, 58],
+                "rain_days": [10, 9, 10, 9, 9, 8, 8, 7, 8, 10, 10, 11]
+            },
+            "Bali": {
+                "temp_min": [24, 24, 24, 24, 23, 23, 22, 22, 23, 23, 24, 24],
+                "temp_max": [31, 31, 31, 32, 31, 30, 29, 30, 30, 31, 32, 31],
+                "precip_mm": [345, 274, 234, 88, 93, 53, 55, 25, 47, 63, 179, 276],
+                "rain_days": [19, 17, 14, 7, 7, 5, 5, 3, 4, 6, 11, 16]
+            },
+            "New York City": {
+                "temp_min": [-3, -2, 2, 7, 12, 18, 21, 20, 16, 10, 5, 0],
+                "temp_max": [4, 6, 10, 17, 22, 27, 29, 28, 24, 18, 12, 6],
+                "precip_mm": [92, 79, 109, 102, 98, 103, 117, 114, 108, 112, 91, 102],
+                "rain_days": [11, 10, 11, 11, 11, 10, 10, 10, 9, 9, 10, 11]
+            },
+            "Tokyo": {
+                "temp_min": [1, 2, 5, 10, 15, 19, 23, 24, 21, 15, 9, 4],
+                "temp_max": [10, 11, 14, 19, 23, 26, 30, 31, 27, 22, 17, 12],
+                "precip_mm": [52, 56, 118, 125, 138, 168, 154, 168, 210, 198, 93, 51],
+                "rain_days": [5, 6, 10, 10, 11, 12, 12, 9, 11, 10, 7, 4]
+            },
+            "Santorini": {
+                "temp_min": [10, 10, 11, 13, 17, 20, 22, 22, 20, 17, 14, 11],
+                "temp_max": [14, 15, 16, 19, 23, 27, 28, 28, 26, 22, 19, 16],
+                "precip_mm": [60, 45, 40, 15, 10, 2, 1, 1, 10, 25, 45, 65],
+                "rain_days": [9, 8, 6, 4, 2, 0.5, 0.3, 0.3, 1, 4, 6, 9]
+            }
+        }
+        names = list(sample_data)
+        tables = {
+            key: np.array([sample_data[name][key] for name in names], dtype=np.float32)
+            for key in ("temp_min", "temp_max", "precip_mm", "rain_days")
+        }
+        tables["destinations"] = np.array(names)
+        return tables
+
+    def save_climatology(self, path):
+        """Write the loaded climatology tables to a compact .npz array file."""
+        np.savez_compressed(
+            path,
+            destinations=np.array(self.destination_names),
+            temp_min=self.temp_min,
+            temp_max=self.temp_max,
+            precip_mm=self.precip_mm,
+            rain_days=self.rain_days
+        )
+
+    def _uniform(self, dest_idx, day_numbers, stream):
+        """
+        Deterministic pseudo-random numbers in [0, 1) per (destination, day, stream).
+
+        A vectorized integer hash, so a given day always gets the same weather
+        and the whole range is generated without a Python loop.
+        """
+        x = (day_numbers.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+             + dest_idx.astype(np.uint64) * np.uint64(0xBF58476D1CE4E5B9)
+             + np.uint64((stream * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF))
+        x ^= x >> np.uint64(31)
+        x *= np.uint64(0xD6E8FEB86659FD93)
+        x ^= x >> np.uint64(32)
+        return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+    def _forecast_days(self, dest_idx, days):
+        """
+        Forecast every (destination, day) pair in one vectorized pass.
+
+        `dest_idx` and `days` are equal-length arrays (destination row and
+        datetime64[D]). Monthly values are interpolated between mid-month
+        points so there is no jump at month boundaries.
+        """
+        months = days.astype('datetime64[M]')
+        month = months.astype(np.int64) % 12
+        days_in_month = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+        day_of_month = (days - months.astype('datetime64[D]')).astype(np.int64)
+
+        # Position relative to the middle of the month, in months (-0.5..0.5)
+        offset = (day_of_month + 0.5) / days_in_month - 0.5
+        neighbour = (month + np.where(offset >= 0, 1, -1)) % 12
+        weight = np.abs(offset)
+
+        def interpolate(table):
+            return (1 - weight) * table[dest_idx, month] + weight * table[dest_idx, neighbour]
+
+        temp_min = interpolate(self.temp_min)
+        temp_max = interpolate(self.temp_max)
+        precip_mm = interpolate(self.precip_mm)
+        rain_days = interpolate(self.rain_days)
+
+        day_numbers = days.astype(np.int64)
+        u1 = self._uniform(dest_idx, day_numbers, 1)
+        u2 = self._uniform(dest_idx, day_numbers, 2)
+        u3 = self._uniform(dest_idx, day_numbers, 3)
+        u4 = self._uniform(dest_idx, day_numbers, 4)
+
+        # Daily temperature anomaly shared by min and max (triangular, +-3 C)
+        anomaly = (u1 + u2 - 1) * 3
+        temp_min = temp_min + anomaly
+        temp_max = temp_max + anomaly
+
+        rain_probability = np.clip(rain_days / days_in_month, 0, 1)
+        is_rainy = u3 < rain_probability
+        mm_per_rain_day = precip_mm / np.maximum(rain_days, 0.1)
+        precipitation = np.where(is_rainy, mm_per_rain_day * (0.5 + u4), 0.0)
+
+        condition = np.select(
+            [
+                is_rainy & (temp_max <= 2),
+                is_rainy & (precipitation >= 10),
+                is_rainy,
+                rain_probability >= 0.4,
+                rain_probability >= 0.2
+            ],
+            [5, 4, 3, 2, 1],
+            default=0
+        )
+
+        return {
+            "temp_min": np.round(temp_min).astype(np.int16),
+            "temp_max": np.round(temp_max).astype(np.int16),
+            "precipitation": np.round(rain_probability * 100).astype(np.int16),
+            "precipitation_mm": np.round(precipitation, 1),
+            "condition": condition.astype(np.int8)
+        }
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            block = self._cache.get(key)
+            if block is not None:
+                self._cache.move_to_end(key)
+            return block
+
+    def _cache_put(self, key, block):
+        with self._cache_lock:
+            self._cache[key] = block
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _forecast_range(self, dest_indices, start, end):
+        """
+        Forecast arrays of shape (len(dest_indices), num_days) for [start, end].
+
+        Whole months are computed and cached per (destination, month); all
+        months missing from the cache are computed together in one pass.
+        """
+        first_month = start.astype('datetime64[M]')
+        month_starts = np.arange(first_month, end.astype('datetime64[M]') + 1)
+
+        blocks = {}
+        missing = []
+        for dest_idx in dest_indices:
+            for month_start in month_starts:
+                key = (int(dest_idx), str(month_start))
+                block = self._cache_get(key)
+                if block is None:
+                    missing.append(key)
+                else:
+                    blocks[key] = block
+
+        if missing:
+            missing_months = np.array([month for _, month in missing], dtype='datetime64[M]')
+            lengths = ((missing_months + 1).astype('datetime64[D]')
+                       - missing_months.astype('datetime64[D]')).astype(np.int64)
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            days = np.repeat(missing_months.astype('datetime64[D]'), lengths) + offsets
+            dest_idx = np.repeat(np.array([dest for dest, _ in missing], dtype=np.int64), lengths)
+
+            forecast = self._forecast_days(dest_idx, days)
+            bounds = np.concatenate(([0], np.cumsum(lengths)))
+            for i, key in enumerate(missing):
+                block = {name: values[bounds[i]:bounds[i + 1]] for name, values in forecast.items()}
+                blocks[key] = block
+                self._cache_put(key, block)
+
+        first = int((start - first_month.astype('datetime64[D]')).astype(np.int64))
+        num_days = int((end - start).astype(np.int64)) + 1
+
+        result = {}
+        for name in ("temp_min", "temp_max", "precipitation", "precipitation_mm", "condition"):
+            rows = [
+                np.concatenate([blocks[(int(dest_idx), str(month))][name] for month in month_starts])
+                for dest_idx in dest_indices
+            ]
+            result[name] = np.stack(rows)[:, first:first + num_days]
+        return result
+
+    def _parse_range(self, dates, max_days):
+        try:
+            start = np.datetime64(datetime.strptime(dates.get("start", ""), "%Y-%m-%d").date(), 'D')
+            end = np.datetime64(datetime.strptime(dates.get("end", ""), "%Y-%m-%d").date(), 'D')
+        except ValueError:
+            return None, None, "Invalid date format. Please use YYYY-MM-DD."
+
+        if end < start:
+            return None, None, "End date must not be before start date."
+        if int((end - start).astype(np.int64)) + 1 > max_days:
+            return None, None, f"Date range must not exceed {max_days} days."
+        return start, end, None
+
+    def forecast_many(self, destinations, dates, max_days=366):
+        """
+        Forecast several destinations over the same date range as arrays.
+
+        Returns {"destinations", "dates", "temp_min", "temp_max",
+        "precipitation", "precipitation_mm", "condition"} where the per-day
+        values have shape (len(destinations), num_days).
+        """
+        unknown = [name for name in destinations if name not in self.destination_index]
+        if unknown:
+            return {
+                "error": f"Destination '{unknown[0]}' not found in the database."
+            }
+
+        start, end, error = self._parse_range(dates, max_days)
+        if error:
+            return {"error": error}
+
+        dest_indices = [self.destination_index[name] for name in destinations]
+        forecast = self._forecast_range(dest_indices, start, end)
+        forecast["condition"] = CONDITIONS[forecast["condition"]]
+        forecast["destinations"] = list(destinations)
+        forecast["dates"] = np.arange(start, end + 1).astype(str)
+        return forecast
+
+    def predict(self, destination, dates, layout='rows'):
+        """
+        Forecast the weather for a destination between dates["start"] and
+        dates["end"] (inclusive).
+
+        With layout='columns', per-day values are returned as parallel lists
+        instead of one dict per day.
+        """
+        forecast = self.forecast_many([destination], dates)
+        if "error" in forecast:
+            return forecast
+
+        day_dates = forecast["dates"].tolist()
+        temp_min = forecast["temp_min"][0].tolist()
+        temp_max = forecast["temp_max"][0].tolist()
+        precipitation = forecast["precipitation"][0].tolist()
+        precipitation_mm = forecast["precipitation_mm"][0].tolist()
+        condition = forecast["condition"][0].tolist()
+
+        if layout == 'columns':
+            days = {
+                "date": day_dates,
+                "temperature_min": temp_min,
+                "temperature_max": temp_max,
+                "precipitation": precipitation,
+                "precipitation_mm": precipitation_mm,
+                "weather_condition": condition
+            }
+        else:
+            days = [
+                {
+                    "date": day_dates[i],
+                    "temperature": {"min": temp_min[i], "max": temp_max[i]},
+                    "precipitation": precipitation[i],
+                    "precipitation_mm": precipitation_mm[i],
+                    "weather_condition": condition[i]
+                }
+                for i in range(len(day_dates))
+            ]
+
+        return {
+            "destination": destination,
+            "forecast": days
+        }
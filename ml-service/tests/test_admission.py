@@ -0,0 +1,87 @@
+import threading
+import time
+
+from flask import Flask, Response, jsonify
+
+from utils.admission import BATCH, INTERACTIVE, AdmissionController, admit
+
+
+def test_batch_lane_is_capped_at_its_share():
+    controller = AdmissionController(4, batch_share=0.5)
+    assert controller.acquire(BATCH) and controller.acquire(BATCH)
+    assert not controller.acquire(BATCH)
+
+    # Interactive requests may still use the rest of the slots
+    assert controller.acquire(INTERACTIVE) and controller.acquire(INTERACTIVE)
+    assert not controller.acquire(INTERACTIVE)
+
+    controller.release(BATCH)
+    assert controller.acquire(BATCH)
+
+
+def test_interactive_wait_times_out_when_full():
+    controller = AdmissionController(1)
+    assert controller.acquire(INTERACTIVE)
+
+    started = time.monotonic()
+    assert not controller.acquire(INTERACTIVE, timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+
+
+def test_interactive_wait_gets_a_released_slot():
+    controller = AdmissionController(1)
+    assert controller.acquire(INTERACTIVE)
+    threading.Timer(0.02, controller.release, args=(INTERACTIVE,)).start()
+    assert controller.acquire(INTERACTIVE, timeout=1.0)
+
+
+def test_batch_never_waits():
+    controller = AdmissionController(1)
+    assert controller.acquire(INTERACTIVE)
+    started = time.monotonic()
+    assert not controller.acquire(BATCH, timeout=1.0)
+    assert time.monotonic() - started < 0.5
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/document')
+    @admit('admission_test_document', limit=1)
+    def document():
+        return jsonify({'status': 'success'})
+
+    @app.route('/stream')
+    @admit('admission_test_stream', limit=1)
+    def stream():
+        return Response(iter(['{"type":"day"}\n']), mimetype='application/x-ndjson')
+
+    return app
+
+
+def test_expired_deadline_is_rejected_with_504():
+    client = make_app().test_client()
+    past = str(int(time.time() * 1000) - 1000)
+    response = client.get('/document', headers={'X-Request-Deadline': past})
+    assert response.status_code == 504
+
+
+def test_open_stream_holds_its_slot_until_closed():
+    client = make_app().test_client()
+    stream = client.get('/stream')
+    assert stream.status_code == 200
+
+    rejected = client.get('/stream')
+    assert rejected.status_code == 503
+    assert rejected.headers['Retry-After']
+
+    stream.close()
+    again = client.get('/stream')
+    assert again.status_code == 200
+    again.close()
+
+
+def test_document_releases_its_slot():
+    client = make_app().test_client()
+    for _ in range(3):
+        assert client.get('/document').status_code == 200
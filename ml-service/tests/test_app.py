@@ -0,0 +1,66 @@
+import pytest
+
+import app as service
+
+CITIES = [{"location": "Paris", "nights": 2}, {"location": "Bali", "nights": 2}]
+
+
+@pytest.fixture
+def client():
+    return service.app.test_client()
+
+
+@pytest.mark.parametrize("body", [
+    {"destinations": CITIES, "constraints": {"flexible_order": True}},
+    {"destinations": CITIES, "constraints": {
+        "flexible_order": True, "trip_start_date": "2026-06-01", "trip_end_date": "2026-06-03"
+    }},
+    {"destinations": [{"location": "Paris", "startDate": "2026-06-0x", "endDate": "2026-06-03"}]},
+])
+@pytest.mark.parametrize("query", ["", "?stream=1"])
+def test_invalid_itinerary_is_rejected_before_streaming(client, body, query):
+    response = client.post('/api/optimize-itinerary' + query, json=body)
+    assert response.status_code == 400
+    assert response.json["status"] == "error"
+
+
+def test_reordered_stream_ends_with_route(client):
+    body = {"destinations": CITIES, "constraints": {"flexible_order": True, "trip_start_date": "2026-06-01"}}
+    response = client.post('/api/optimize-itinerary?stream=1', json=body)
+    lines = response.get_data(as_text=True).splitlines()
+    response.close()
+
+    assert response.status_code == 200
+    assert '"type":"summary"' in lines[-1] and '"route"' in lines[-1]
+
+
+def recommend(client, diversity):
+    return client.post('/api/recommendations', json={
+        "preferences": {"categories": ["beach", "cultural"]},
+        "diversity": diversity
+    })
+
+
+def test_diversity_options_are_converted(client):
+    as_numbers = recommend(client, {"maxPerCountry": 1, "weight": 0.5})
+    as_strings = recommend(client, {"maxPerCountry": "1", "weight": "0.5"})
+    assert as_strings.status_code == 200
+    assert as_strings.json == as_numbers.json
+
+
+def test_empty_diversity_object_uses_the_defaults(client):
+    assert recommend(client, {}).json == recommend(client, True).json
+
+
+def test_diversity_weight_is_clamped(client):
+    assert recommend(client, {"weight": 5}).json == recommend(client, {"weight": 1}).json
+    assert recommend(client, {"weight": -2}).json == recommend(client, {"weight": 0}).json
+
+
+@pytest.mark.parametrize("diversity", [
+    {"maxPerCountry": "one"}, {"maxPerCountry": 0}, {"weight": "high"}, {"weight": "nan"}, "yes"
+])
+def test_malformed_diversity_is_rejected(client, diversity):
+    response = recommend(client, diversity)
+    assert response.status_code == 400
+    assert response.json["status"] == "error"
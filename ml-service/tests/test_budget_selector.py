@@ -0,0 +1,122 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from models.budget_selector import BudgetedActivitySelector
+
+
+def brute_force(costs, minutes, values, budget, available_minutes):
+    """Best total value over every subset that fits the real budget and day."""
+    best = 0.0
+    for size in range(1, len(costs) + 1):
+        for subset in itertools.combinations(range(len(costs)), size):
+            subset = list(subset)
+            if costs[subset].sum() <= budget + 1e-9 and minutes[subset].sum() <= available_minutes:
+                best = max(best, values[subset].clip(min=0).sum())
+    return best
+
+
+def random_case(rng, n):
+    costs = rng.integers(0, 12, n) * 5.0
+    minutes = rng.integers(2, 12, n) * 15.0 + 30
+    values = rng.uniform(0, 10, n)
+    return costs, minutes, values, float(rng.integers(0, 30) * 5), float(rng.integers(4, 45) * 15)
+
+
+def check_feasible(chosen, costs, minutes, budget, available_minutes):
+    assert chosen == sorted(set(chosen))
+    assert costs[chosen].sum() <= budget + 1e-9
+    assert minutes[chosen].sum() <= available_minutes
+
+
+@pytest.mark.parametrize("costs, budget, expected", [
+    ([10, 10, 10], 30, [0, 1, 2]),
+    ([5, 25], 30, [0, 1]),
+    ([0.1, 0.2], 0.3, [0, 1]),
+])
+def test_exact_fill_of_budget_is_kept(costs, budget, expected):
+    costs = np.array(costs, dtype=float)
+    chosen, exact = BudgetedActivitySelector().select(costs, [60] * len(costs), [1] * len(costs), budget, 600)
+    assert chosen == expected
+    assert exact
+
+
+def test_dp_matches_brute_force():
+    rng = np.random.default_rng(0)
+    selector = BudgetedActivitySelector()
+    for _ in range(300):
+        costs, minutes, values, budget, available_minutes = random_case(rng, int(rng.integers(1, 10)))
+        chosen, exact = selector.select(costs, minutes, values, budget, available_minutes)
+
+        check_feasible(chosen, costs, minutes, budget, available_minutes)
+        assert exact
+        assert values[chosen].sum() == pytest.approx(brute_force(costs, minutes, values, budget, available_minutes))
+
+
+def test_fractional_costs_match_brute_force():
+    rng = np.random.default_rng(1)
+    selector = BudgetedActivitySelector()
+    for _ in range(100):
+        n = int(rng.integers(1, 9))
+        costs = np.round(rng.uniform(0, 40, n), 2)
+        minutes = rng.integers(45, 240, n).astype(float)
+        values = rng.uniform(0, 10, n)
+        budget, available_minutes = float(rng.uniform(0, 100)), float(rng.integers(60, 720))
+        chosen, exact = selector.select(costs, minutes, values, budget, available_minutes)
+
+        check_feasible(chosen, costs, minutes, budget, available_minutes)
+        if exact:
+            assert values[chosen].sum() == pytest.approx(brute_force(costs, minutes, values, budget, available_minutes))
+
+
+@pytest.mark.parametrize("max_cells", [0, 4_000_000])
+def test_approximate_selection_fits_real_budget(max_cells):
+    # Costs that aren't whole cents use the coarse grid with repair;
+    # max_cells=0 forces the greedy pass
+    rng = np.random.default_rng(2)
+    selector = BudgetedActivitySelector(max_cells=max_cells)
+    for _ in range(200):
+        n = int(rng.integers(1, 10))
+        costs = rng.uniform(0, 60, n) + 0.001
+        minutes = rng.integers(45, 240, n).astype(float)
+        values = rng.uniform(0, 10, n)
+        budget, available_minutes = float(rng.uniform(0, 150)), float(rng.integers(60, 720))
+        chosen, exact = selector.select(costs, minutes, values, budget, available_minutes)
+
+        check_feasible(chosen, costs, minutes, budget, available_minutes)
+        if chosen:
+            assert not exact
+
+
+def test_split_budget_matches_brute_force():
+    rng = np.random.default_rng(3)
+    selector = BudgetedActivitySelector()
+    for _ in range(50):
+        costs, minutes, values, _, available_minutes = random_case(rng, int(rng.integers(1, 6)))
+        num_days = int(rng.integers(1, 4))
+        budget = float(rng.integers(0, 20) * 5)
+        shares = selector.split_budget([(costs, minutes, values, num_days)], budget, None, available_minutes)
+
+        assert len(shares) == num_days
+        assert sum(shares) <= budget + 1e-9
+        # Every way of giving each day a multiple of 5 within the budget
+        day_value = {
+            spend: brute_force(costs, minutes, values, spend, available_minutes)
+            for spend in range(0, int(budget) + 1, 5)
+        }
+        best = max(
+            sum(day_value[spend] for spend in split)
+            for split in itertools.product(day_value, repeat=num_days)
+            if sum(split) <= budget
+        )
+        planned = sum(brute_force(costs, minutes, values, share, available_minutes) for share in shares)
+        assert planned == pytest.approx(best)
+
+
+def test_split_budget_respects_daily_cap():
+    costs = np.array([15.0, 25.0])
+    shares = BudgetedActivitySelector().split_budget(
+        [(costs, [270.0, 210.0], [9.0, 8.0], 4)], 100, 20, 660
+    )
+    assert shares == [15.0, 15.0, 15.0, 15.0]
@@ -0,0 +1,37 @@
+from flask import Flask, Response, jsonify
+
+from utils.caching import conditional
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/document', methods=['POST'])
+    @conditional()
+    def document():
+        return jsonify({'status': 'success'})
+
+    @app.route('/stream', methods=['POST'])
+    @conditional()
+    def stream():
+        return Response(iter(['{"type":"error","message":"Request deadline exceeded"}\n']),
+                        mimetype='application/x-ndjson')
+
+    return app
+
+
+def test_document_is_revalidated_with_its_etag():
+    client = make_app().test_client()
+    first = client.post('/document', json={'a': 1})
+    assert first.status_code == 200 and first.headers.get('ETag')
+
+    again = client.post('/document', json={'a': 1}, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_stream_gets_no_etag():
+    client = make_app().test_client()
+    response = client.post('/stream', json={'a': 1})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    response.close()
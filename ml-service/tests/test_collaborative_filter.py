@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from models.collaborative_filter import ItemItemCollaborativeFilter
+
+ITEMS = [f"city-{i}" for i in range(12)]
+
+
+def random_histories(rng, n_users):
+    return {
+        f"user-{u}": rng.choice(ITEMS, size=int(rng.integers(1, 6)), replace=True).tolist()
+        for u in range(n_users)
+    }
+
+
+def assert_same_model(model, expected):
+    np.testing.assert_allclose(model.co_counts.toarray(), expected.co_counts.toarray())
+    np.testing.assert_allclose(model.similarity.toarray(), expected.similarity.toarray(), rtol=1e-6)
+    assert model.user_items == expected.user_items
+
+
+def test_partial_fit_matches_full_fit():
+    rng = np.random.default_rng(0)
+    model = ItemItemCollaborativeFilter(ITEMS, top_n=4)
+    recorded = {}
+    # Trips arrive one batch at a time, some for users seen before
+    for _ in range(120):
+        user_id = f"user-{int(rng.integers(0, 40))}"
+        trips = rng.choice(ITEMS, size=int(rng.integers(1, 4))).tolist()
+        model.partial_fit(user_id, trips)
+        recorded.setdefault(user_id, []).extend(trips)
+
+    assert_same_model(model, ItemItemCollaborativeFilter(ITEMS, top_n=4).fit(recorded))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    model = ItemItemCollaborativeFilter(ITEMS, top_n=4).fit(random_histories(rng, 30))
+    path = str(tmp_path / "similarity.npz")
+    model.save(path, log_offset=123)
+
+    loaded, extra = ItemItemCollaborativeFilter.load(path)
+    assert_same_model(loaded, model)
+    assert int(extra["log_offset"]) == 123
+
+    # Later updates behave the same on the loaded model
+    model.partial_fit("user-0", ["city-3", "city-7"])
+    loaded.partial_fit("user-0", ["city-3", "city-7"])
+    assert_same_model(loaded, model)
+
+
+def test_load_reindexes_to_new_item_order(tmp_path):
+    rng = np.random.default_rng(2)
+    histories = random_histories(rng, 30)
+    path = str(tmp_path / "similarity.npz")
+    ItemItemCollaborativeFilter(ITEMS, top_n=4).fit(histories).save(path)
+
+    reordered = ITEMS[::-1][:-2]  # reversed, without the first two items
+    loaded, _ = ItemItemCollaborativeFilter.load(path, item_names=reordered)
+    kept = {
+        user_id: [name for name in trips if name in reordered]
+        for user_id, trips in histories.items()
+    }
+    expected = ItemItemCollaborativeFilter(reordered, top_n=4).fit(
+        {user_id: trips for user_id, trips in kept.items() if trips}
+    )
+    np.testing.assert_allclose(loaded.co_counts.toarray(), expected.co_counts.toarray())
+    assert loaded.score(["city-5"]) == pytest.approx(expected.score(["city-5"]), rel=1e-6)
+
+
+def test_update_after_offline_ingestion_matches_full_fit(tmp_path):
+    from ingest_catalog import ingest_histories
+
+    trips = {"alice": ["Paris", "Tokyo"], "bob": ["Paris", "Santorini"], "42": ["Tokyo", "Santorini"]}
+    source = tmp_path / "trips.jsonl"
+    source.write_text(
+        '{"userId": "alice", "destinations": ["Paris", "Tokyo"]}\n'
+        '{"userId": "bob", "destination": "Paris"}\n'
+        '{"userId": "bob", "destination": "Santorini"}\n'
+        '{"userId": 42, "destinations": ["Tokyo", "Santorini"]}\n'
+    )
+    path = str(tmp_path / "similarity.npz")
+    ingest_histories(str(source), path, progress=False, top_n=4)
+
+    names = ["Paris", "Santorini", "Tokyo"]
+    loaded, _ = ItemItemCollaborativeFilter.load(path, item_names=names)
+    loaded.partial_fit("alice", ["Santorini"])
+    loaded.partial_fit(42, ["Paris"])
+
+    trips["alice"].append("Santorini")
+    trips["42"].append("Paris")
+    assert_same_model(loaded, ItemItemCollaborativeFilter(names, top_n=4).fit(trips))
+
+
+def test_concurrent_saves_publish_a_complete_snapshot(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    rng = np.random.default_rng(3)
+    models = [ItemItemCollaborativeFilter(ITEMS, top_n=4).fit(random_histories(rng, 200)) for _ in range(4)]
+    path = str(tmp_path / "similarity.npz")
+    with ThreadPoolExecutor(len(models)) as pool:
+        for result in [pool.submit(model.save, path) for model in models * 5]:
+            result.result()
+
+    loaded, _ = ItemItemCollaborativeFilter.load(path)
+    assert any(loaded.user_items == model.user_items for model in models)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["similarity.npz"]
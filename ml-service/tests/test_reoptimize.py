@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from models.itinerary_optimizer import ItineraryOptimizer
+
+PARIS = [{"location": "Paris", "startDate": "2026-06-01", "endDate": "2026-06-04"}]
+
+
+@pytest.fixture(scope="module")
+def optimizer():
+    return ItineraryOptimizer()
+
+
+@pytest.fixture(scope="module")
+def previous(optimizer):
+    return optimizer.optimize(PARIS, {}, {})
+
+
+def days_of(result):
+    return result["itinerary"][0]["daily_itineraries"]
+
+
+def minutes(clock):
+    hours, mins = clock.split(":")
+    return int(hours) * 60 + int(mins)
+
+
+def edit(kind, date="2026-06-01", **fields):
+    return {"type": kind, "destination": "Paris", "date": date, **fields}
+
+
+def test_pin_is_placed_at_its_time_and_others_fit_around(optimizer, previous):
+    result = optimizer.reoptimize(previous, [edit("pin", activity_id="p5", start_time="14:00")], {}, {})
+    day = days_of(result)[0]
+
+    pinned = [activity for activity in day["activities"] if activity["id"] == "p5"]
+    assert [activity["start_time"] for activity in pinned] == ["14:00"]
+    pin_start, pin_end = minutes("14:00"), minutes(pinned[0]["end_time"])
+
+    others = [activity for activity in day["activities"] if activity["id"] != "p5"]
+    assert others
+    for activity in others:
+        start, end = minutes(activity["start_time"]), minutes(activity["end_time"])
+        assert minutes("09:00") <= start and end <= minutes("20:00")
+        assert end <= pin_start or start >= pin_end
+    assert day["pinned"] == [{"activity_id": "p5", "start_time": "14:00"}]
+
+
+# A wide day window for the opening-hours cases, so only the opening hours can fail
+WIDE_DAY = {"daily_start_time": "07:00", "daily_end_time": "22:00"}
+
+
+@pytest.mark.parametrize("edits, constraints, message", [
+    ([edit("pin", activity_id="p5", start_time="14:00"),
+      edit("pin", activity_id="p3", start_time="15:00")], {}, "overlap"),
+    ([edit("pin", activity_id="p2", start_time="08:00")], WIDE_DAY, "opening hours"),
+    ([edit("pin", activity_id="p2", start_time="17:00")], WIDE_DAY, "opening hours"),
+    ([edit("pin", activity_id="p4", start_time="19:00")], {}, "does not fit"),
+])
+def test_impossible_pins_are_rejected(optimizer, previous, edits, constraints, message):
+    result = optimizer.reoptimize(previous, edits, {}, constraints)
+    assert message in result["error"]
+
+
+def test_removal_persists_across_later_edits(optimizer, previous):
+    first = optimizer.reoptimize(previous, [edit("remove", activity_id="p1")], {}, {})
+    assert "p1" not in [activity["id"] for activity in days_of(first)[0]["activities"]]
+
+    second = optimizer.reoptimize(first, [edit("pin", activity_id="p5", start_time="14:00")], {}, {})
+    day = days_of(second)[0]
+    assert "p1" not in [activity["id"] for activity in day["activities"]]
+    assert day["removed"] == ["p1"]
+    assert day["pinned"] == [{"activity_id": "p5", "start_time": "14:00"}]
+
+
+def test_untouched_and_locked_days_are_returned_unchanged(optimizer, previous):
+    edits = [
+        edit("remove", activity_id="p1"),
+        edit("lock_day", date="2026-06-02"),
+        edit("remove", date="2026-06-02", activity_id="p2"),
+    ]
+    result = optimizer.reoptimize(previous, edits, {}, {})
+    before, after = days_of(previous), days_of(result)
+
+    assert after[0] != before[0]
+    assert json.dumps(after[1]) == json.dumps({**before[1], "locked": True})
+    assert json.dumps(after[2]) == json.dumps(before[2])
+    assert result["summary"]["replanned_days"] == 1
+
+    # A locked day stays locked without repeating the lock
+    again = optimizer.reoptimize(result, [edit("remove", date="2026-06-02", activity_id="p2")], {}, {})
+    assert json.dumps(days_of(again)[1]) == json.dumps(after[1])
+
+
+@pytest.mark.parametrize("date, destination", [("2026-07-01", "Paris"), ("2026-06-01", "Bali")])
+def test_edits_for_unknown_days_are_rejected(optimizer, previous, date, destination):
+    result = optimizer.reoptimize(
+        previous, [{"type": "remove", "destination": destination, "date": date, "activity_id": "p1"}], {}, {}
+    )
+    assert "No day" in result["error"]
+
+
+def test_replanned_day_keeps_the_accommodation_base(optimizer):
+    base = {"lat": 48.8867, "lng": 2.3431}
+    planned = optimizer.optimize([{**PARIS[0], "base": base}], {}, {})
+    assert planned["itinerary"][0]["base"] == base
+
+    result = optimizer.reoptimize(planned, [edit("remove", activity_id="p1")], {}, {})
+    assert result["itinerary"][0]["base"] == base
+    first = days_of(result)[0]["activities"][0]
+    expected = optimizer._estimate_travel_time(
+        base["lat"], base["lng"], first["coordinates"]["lat"], first["coordinates"]["lng"]
+    )
+    assert first["travel_time"] == pytest.approx(expected)
+    assert first["travel_time"] > 0
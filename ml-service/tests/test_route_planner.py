@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from models.route_planner import DestinationRoutePlanner, _travel_time_matrix
+
+
+def random_cities(rng, n):
+    return [{"lat": float(lat), "lng": float(lng)}
+            for lat, lng in zip(rng.uniform(35, 60, n), rng.uniform(-10, 30, n))]
+
+
+def route_length(coordinates, order, origin=None, round_trip=False):
+    """Travel hours along `order`, from and back to `origin` when given."""
+    points = [(c["lat"], c["lng"]) for c in coordinates]
+    if origin is not None:
+        points.append((origin["lat"], origin["lng"]))
+    travel = _travel_time_matrix(tuple(points))
+
+    n = len(coordinates)
+    total = sum(travel[a, b] for a, b in zip(order, order[1:]))
+    if origin is not None:
+        total += travel[n, order[0]]
+        if round_trip:
+            total += travel[order[-1], n]
+    return total
+
+
+def brute_force(coordinates, origin=None, round_trip=False):
+    """Shortest total travel over every ordering of the cities."""
+    return min(
+        route_length(coordinates, order, origin, round_trip)
+        for order in itertools.permutations(range(len(coordinates)))
+    )
+
+
+@pytest.mark.parametrize("with_origin, round_trip", [(False, False), (True, False), (True, True)])
+def test_held_karp_matches_brute_force(with_origin, round_trip):
+    rng = np.random.default_rng(0)
+    planner = DestinationRoutePlanner()
+    for _ in range(30):
+        coordinates = random_cities(rng, int(rng.integers(1, 8)))
+        origin = random_cities(rng, 1)[0] if with_origin else None
+        order, hours, exact = planner.plan(coordinates, origin=origin, round_trip=round_trip)
+
+        assert exact
+        assert sorted(order) == list(range(len(coordinates)))
+        assert hours == pytest.approx(brute_force(coordinates, origin, round_trip))
+        assert hours == pytest.approx(route_length(coordinates, order, origin, round_trip))
+
+
+def test_heuristic_returns_a_valid_route():
+    rng = np.random.default_rng(1)
+    coordinates = random_cities(rng, 7)
+    order, hours, exact = DestinationRoutePlanner(exact_limit=3).plan(coordinates)
+
+    assert not exact
+    assert sorted(order) == list(range(7))
+    assert hours == pytest.approx(route_length(coordinates, order))
+    assert hours >= brute_force(coordinates) - 1e-9
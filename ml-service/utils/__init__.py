@@ -0,0 +1 @@
+# Shared helpers for the Trip Planner ML service 
\ No newline at end of file
@@ -0,0 +1,140 @@
+import os
+import time
+import threading
+from functools import wraps
+
+from flask import jsonify, make_response, request
+
+from .deadlines import reset_deadline, set_deadline
+
+# Callers send an absolute deadline (Unix epoch milliseconds) and, for
+# backfills and other bulk jobs, a "batch" priority:
+#   X-Request-Deadline: 1718000000123
+#   X-Request-Priority: batch
+DEADLINE_HEADER = 'X-Request-Deadline'
+PRIORITY_HEADER = 'X-Request-Priority'
+
+# Fallback time budget in seconds for requests without a deadline header (unset: none)
+DEFAULT_TIMEOUT = float(os.environ.get('DEFAULT_REQUEST_TIMEOUT', 0)) or None
+# Share of an endpoint's slots that batch requests may occupy
+BATCH_SHARE = float(os.environ.get('BATCH_SHARE', 0.5))
+# How long an interactive request may wait for a slot before being rejected
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 0.05))
+RETRY_AFTER_SECONDS = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+
+class AdmissionController:
+    """
+    Concurrency limit for one endpoint with two priority lanes.
+
+    Interactive requests may use every slot and wait briefly for one to free
+    up. Batch requests are capped at a share of the slots and never wait, so
+    a backfill can't take over the endpoint or hold interactive calls in a
+    queue. Limits are per worker process.
+    """
+
+    def __init__(self, limit, batch_share=BATCH_SHARE):
+        self.limit = max(1, int(limit))
+        self.batch_limit = max(1, int(self.limit * batch_share))
+        self.active = {INTERACTIVE: 0, BATCH: 0}
+        self._condition = threading.Condition()
+
+    def _has_room(self, lane):
+        if sum(self.active.values()) >= self.limit:
+            return False
+        return lane != BATCH or self.active[BATCH] < self.batch_limit
+
+    def acquire(self, lane, timeout=0.0):
+        """Take a slot in `lane`, waiting up to `timeout` seconds. Returns False if rejected."""
+        with self._condition:
+            if lane == INTERACTIVE and timeout > 0:
+                self._condition.wait_for(lambda: self._has_room(lane), timeout)
+            if not self._has_room(lane):
+                return False
+            self.active[lane] += 1
+            return True
+
+    def release(self, lane):
+        with self._condition:
+            self.active[lane] -= 1
+            self._condition.notify()
+
+
+def _request_deadline():
+    """Monotonic deadline for the current request, or None."""
+    header = request.headers.get(DEADLINE_HEADER)
+    if header:
+        try:
+            # Convert the wall-clock deadline to the monotonic clock
+            return time.monotonic() + float(header) / 1000.0 - time.time()
+        except ValueError:
+            pass
+    if DEFAULT_TIMEOUT:
+        return time.monotonic() + DEFAULT_TIMEOUT
+    return None
+
+
+def _request_lane():
+    priority = request.headers.get(PRIORITY_HEADER, '').strip().lower()
+    return BATCH if priority == BATCH else INTERACTIVE
+
+
+def _error(message, status, retry_after=None):
+    response = make_response(jsonify({
+        'status': 'error',
+        'message': message
+    }), status)
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def admit(name, limit):
+    """
+    Admission control for an endpoint.
+
+    Rejects with 503 + Retry-After when the endpoint is at its concurrency
+    limit (MAX_CONCURRENT_<NAME> overrides `limit`), with 504 when the
+    deadline has already passed, and otherwise runs the view with the
+    deadline set for cooperative checks in model code. Streamed responses
+    keep their slot until the stream is closed.
+    """
+    limit = int(os.environ.get(f'MAX_CONCURRENT_{name.upper()}', limit))
+    controller = AdmissionController(limit)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            deadline = _request_deadline()
+            lane = _request_lane()
+
+            wait = QUEUE_TIMEOUT
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return _error('Request deadline exceeded', 504)
+                wait = min(wait, left)
+
+            if not controller.acquire(lane, wait):
+                return _error(
+                    f'Too many concurrent {name} requests', 503,
+                    retry_after=RETRY_AFTER_SECONDS
+                )
+
+            token = set_deadline(deadline)
+            streamed = False
+            try:
+                response = make_response(view(*args, **kwargs))
+                if response.is_streamed:
+                    response.call_on_close(lambda: controller.release(lane))
+                    streamed = True
+                return response
+            finally:
+                reset_deadline(token)
+                if not streamed:
+                    controller.release(lane)
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+import os
+import json
+import hashlib
+from datetime import date
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+# Bump (or set via the environment) whenever model data or logic changes, so
+# clients holding an old ETag get fresh content.
+MODEL_VERSION = os.environ.get('MODEL_VERSION', '1')
+
+
+def canonical_request_key(*extra):
+    """
+    Hash everything that determines a response: path, query, body and the
+    negotiated representation, plus the model version and any extra parts.
+
+    The JSON body is re-serialized with sorted keys so that semantically equal
+    requests map to the same key regardless of key order or whitespace.
+    """
+    body = request.get_json(silent=True)
+    parts = [
+        MODEL_VERSION,
+        request.path,
+        json.dumps(sorted(request.args.items(multi=True)), separators=(',', ':')),
+        json.dumps(body, sort_keys=True, separators=(',', ':')),
+        request.headers.get('Accept', ''),
+    ]
+    parts.extend(str(part) for part in extra)
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def conditional(*vary):
+    """
+    Add ETag validators to a deterministic endpoint.
+
+    The ETag is derived from the canonical request key, so a matching
+    If-None-Match is answered with 304 before the view (and the model) runs.
+    `vary` callables contribute extra key parts for outputs that depend on
+    something outside the request, e.g. today's date. Streamed responses
+    get no ETag: their status is sent before the body, which may still end
+    in an error line.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = canonical_request_key(*(part() for part in vary))[:32]
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def today():
+    """Key part for responses that change from day to day."""
+    return date.today().isoformat()
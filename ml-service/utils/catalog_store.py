@@ -0,0 +1,170 @@
+import os
+import json
+import shutil
+
+import numpy as np
+
+# On-disk layout of an ingested catalog directory:
+#   meta.json               row count, column kinds and code vocabularies
+#   <col>.npy               numeric columns and code columns (one value per row)
+#   <col>.offsets.npy       string columns: int64 offsets (rows + 1) into ...
+#   <col>.blob.npy          ... the concatenated UTF-8 bytes (uint8)
+# Everything is plain .npy so catalogs can be memory-mapped when loaded.
+
+FORMAT_VERSION = 1
+CODE_DTYPE = np.int32
+
+
+class CatalogWriter:
+    """
+    Append-only columnar writer with bounded memory.
+
+    Each chunk is appended to raw per-column spill files; close() wraps them
+    into .npy files by writing a header and streaming the bytes across, so
+    the full catalog is never held in memory.
+    """
+
+    def __init__(self, directory, columns):
+        # columns: list of (name, kind) where kind is "str", "code" or a NumPy dtype
+        self.directory = directory
+        self.columns = columns
+        self.rows = 0
+        self.vocabularies = {name: {} for name, kind in columns if kind == "code"}
+        self._string_bytes = {name: 0 for name, kind in columns if kind == "str"}
+
+        os.makedirs(directory, exist_ok=True)
+        self._spills = {}
+        for name, kind in columns:
+            if kind == "str":
+                self._spills[name + ".offsets"] = open(self._spill_path(name + ".offsets"), "wb")
+                self._spills[name + ".blob"] = open(self._spill_path(name + ".blob"), "wb")
+                np.zeros(1, dtype=np.int64).tofile(self._spills[name + ".offsets"])
+            else:
+                self._spills[name] = open(self._spill_path(name), "wb")
+
+    def _spill_path(self, name):
+        return os.path.join(self.directory, name + ".spill")
+
+    def _code(self, name, value):
+        vocabulary = self.vocabularies[name]
+        code = vocabulary.get(value)
+        if code is None:
+            code = vocabulary[value] = len(vocabulary)
+        return code
+
+    def write_chunk(self, records):
+        """Append a list of normalized records (dicts keyed by column name)."""
+        if not records:
+            return
+
+        for name, kind in self.columns:
+            values = [record[name] for record in records]
+            if kind == "str":
+                encoded = [value.encode("utf-8") for value in values]
+                lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+                offsets = self._string_bytes[name] + np.cumsum(lengths)
+                offsets.tofile(self._spills[name + ".offsets"])
+                self._spills[name + ".blob"].write(b"".join(encoded))
+                self._string_bytes[name] = int(offsets[-1])
+            elif kind == "code":
+                codes = np.fromiter((self._code(name, v) for v in values), dtype=CODE_DTYPE, count=len(values))
+                codes.tofile(self._spills[name])
+            else:
+                np.asarray(values, dtype=kind).tofile(self._spills[name])
+
+        self.rows += len(records)
+
+    def _finalize(self, name, dtype, count):
+        """Turn a raw spill file into a .npy file without loading it."""
+        spill = self._spill_path(name)
+        with open(os.path.join(self.directory, name + ".npy"), "wb") as out:
+            header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                      "fortran_order": False, "shape": (count,)}
+            np.lib.format.write_array_header_1_0(out, header)
+            with open(spill, "rb") as raw:
+                shutil.copyfileobj(raw, out, 1 << 20)
+        os.remove(spill)
+
+    def close(self, extra_meta=None):
+        """Finish all column files and write meta.json."""
+        for spill in self._spills.values():
+            spill.close()
+
+        for name, kind in self.columns:
+            if kind == "str":
+                self._finalize(name + ".offsets", np.int64, self.rows + 1)
+                self._finalize(name + ".blob", np.uint8, self._string_bytes[name])
+            elif kind == "code":
+                self._finalize(name, CODE_DTYPE, self.rows)
+            else:
+                self._finalize(name, kind, self.rows)
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "rows": self.rows,
+            "columns": [[name, kind] for name, kind in self.columns],
+            "vocabularies": {
+                name: sorted(vocabulary, key=vocabulary.get)
+                for name, vocabulary in self.vocabularies.items()
+            }
+        }
+        meta.update(extra_meta or {})
+        with open(os.path.join(self.directory, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+
+def catalog_exists(directory):
+    return bool(directory) and os.path.exists(os.path.join(directory, "meta.json"))
+
+
+def load_catalog(directory, mmap=True):
+    """
+    Load an ingested catalog as {"meta": ..., "columns": {...}}.
+
+    String columns are returned as (offsets, blob) pairs; use read_strings
+    and read_codes to decode them.
+    """
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+
+    mmap_mode = "r" if mmap else None
+    columns = {}
+    for name, kind in meta["columns"]:
+        if kind == "str":
+            columns[name] = (
+                np.load(os.path.join(directory, name + ".offsets.npy"), mmap_mode=mmap_mode),
+                np.load(os.path.join(directory, name + ".blob.npy"), mmap_mode=mmap_mode)
+            )
+        else:
+            columns[name] = np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode)
+    return {"meta": meta, "columns": columns}
+
+
+def read_strings(catalog, name, rows=None):
+    """
+    Decode a string column into a list of str.
+
+    With `rows` (an index array) only those rows are decoded, each sliced
+    straight out of the (memory-mapped) blob, so the rest of the column is
+    never read.
+    """
+    offsets, blob = catalog["columns"][name]
+    if rows is None:
+        data = bytes(blob)
+        offsets = offsets.tolist()
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = offsets[rows].tolist()
+    ends = offsets[rows + 1].tolist()
+    return [bytes(blob[start:end]).decode("utf-8") for start, end in zip(starts, ends)]
+
+
+def read_codes(catalog, name, rows=None):
+    """Decode a code column (or only `rows` of it) into a list of its vocabulary values."""
+    vocabulary = catalog["meta"]["vocabularies"][name]
+    codes = catalog["columns"][name]
+    if rows is not None:
+        codes = codes[np.asarray(rows, dtype=np.int64)]
+    return [vocabulary[code] for code in codes.tolist()]
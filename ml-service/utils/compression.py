@@ -0,0 +1,58 @@
+import os
+import gzip
+import zlib
+
+from flask import request
+
+# Responses smaller than this are sent as-is; compressing them costs more CPU
+# than it saves in bandwidth.
+MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+
+
+def _accepts_gzip():
+    return request.accept_encodings['gzip'] > 0
+
+
+def _gzip_stream(chunks, level):
+    """Gzip a streamed body, flushing after every chunk so streaming is preserved."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response):
+    """Gzip the response body when the client accepts it and it is worth it."""
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.status_code == 204
+            or 'Content-Encoding' in response.headers
+            or not _accepts_gzip()):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if response.is_streamed:
+        response.response = _gzip_stream(response.response, LEVEL)
+        response.direct_passthrough = False
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers.pop('Content-Length', None)
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def init_compression(app):
+    """Register response compression on a Flask app."""
+    app.after_request(compress_response)
+    return app
@@ -0,0 +1,70 @@
+import time
+from contextvars import ContextVar
+
+# Monotonic time by which the current request must be answered, or None.
+# Kept in a context variable so model code can check it without any Flask
+# imports, and so concurrent requests (threads or greenlets) don't mix.
+_deadline = ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised from inside model code once the caller's deadline has passed."""
+
+
+def set_deadline(deadline):
+    """Set the deadline for the current context; returns a token for reset_deadline."""
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def current_deadline():
+    return _deadline.get()
+
+
+def remaining():
+    """Seconds left before the deadline (None when there is no deadline)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline():
+    """
+    Cooperative cancellation point for long loops.
+
+    Cheap enough to call once per iteration: a context variable lookup and a
+    clock read.
+    """
+    deadline = _deadline.get()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def bind_deadline(iterable):
+    """
+    Iterate `iterable` under the deadline that is current now.
+
+    Streamed responses are produced after the view has returned, so the
+    deadline has to be carried into the generator explicitly. An expired
+    deadline raises DeadlineExceeded out of the stream, which ndjson_stream
+    reports as a final {"type": "error"} line.
+    """
+    # Captured now, not on the first next(), which runs after the view returns
+    deadline = _deadline.get()
+
+    def generate():
+        iterator = iter(iterable)
+        while True:
+            token = _deadline.set(deadline)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _deadline.reset(token)
+            yield item
+    return generate()
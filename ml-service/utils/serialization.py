@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+from flask import Response
+
+# orjson is optional: it is several times faster than the stdlib encoder for
+# the large itinerary and price payloads, but everything works without it.
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """Convert NumPy scalars and arrays that the encoders cannot handle natively."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Serialize a payload to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def parse_fields(value):
+    """
+    Parse a field-selection parameter.
+
+    Accepts a comma-separated string ("id,name") or a list; returns a tuple of
+    field names, or None when no selection was requested.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = tuple(field.strip() for field in value if field and field.strip())
+    return fields or None
+
+
+def select_fields(record, fields):
+    """Return only the requested keys of a record (all keys if fields is None)."""
+    if fields is None:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def json_response(payload, status=200):
+    """Build a JSON response using the fastest available encoder."""
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def ndjson_stream(events):
+    """
+    Encode an iterable of events as newline-delimited JSON chunks.
+
+    Errors raised while the events are being produced are reported as a final
+    {"type": "error"} line, since the status code has already been sent.
+    """
+    try:
+        for event in events:
+            yield dumps(event) + b'\n'
+    except Exception as e:
+        yield dumps({'type': 'error', 'message': str(e)}) + b'\n'